@@ -0,0 +1,14 @@
+'''
+Version: 0.0.4
+Python BitId library
+Modules initialize their costly state (imports, tables) on first use. warmup() initializes it up front.
+'''
+
+
+def warmup():
+    '''
+    Initializes up front the state otherwise built on first use (imports, hash state, EC tables)
+    For servers which prefer to pay this cost at startup rather than during the first requests
+    '''
+    from pybitid import bitid
+    bitid.warmup()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+'''
+Version: 0.0.4
+Admission control of challenge verifications (load shedding under overload)
+Callbacks are rejected before any EC operation if:
+- the client exceeds its rate (token bucket per client key),
+- the nonce was not issued by the server, is expired or is already being verified (replay),
+- too many verifications are in flight (some slots are reserved for challenges issued recently).
+Usage:
+    controller = AdmissionController()
+    bitid_uri = controller.issue(callback_uri)
+    ...
+    is_valid = controller.challenge_valid(addr, sign, bitid_uri, callback_uri, client_key=remote_ip)
+'''
+import time
+import threading
+from collections import OrderedDict
+from pybitid import bitid
+
+MAX_IN_FLIGHT       = 16
+RESERVED_SLOTS      = 4
+PRIORITY_WINDOW     = 60
+NONCE_TTL           = 600
+MAX_NONCES          = 100000
+CLIENT_RATE         = 1.0
+CLIENT_BURST        = 5
+MAX_CLIENTS         = 100000
+
+# Results of an admission check
+ACCEPTED            = "accepted"
+REJECT_INVALID      = "invalid"
+REJECT_RATE_LIMITED = "rate_limited"
+REJECT_UNKNOWN      = "unknown_nonce"
+REJECT_EXPIRED      = "expired_nonce"
+REJECT_IN_FLIGHT    = "nonce_in_flight"
+REJECT_OVERLOADED   = "overloaded"
+RESULTS             = (ACCEPTED, REJECT_INVALID, REJECT_RATE_LIMITED, REJECT_UNKNOWN, REJECT_EXPIRED, REJECT_IN_FLIGHT,
+                       REJECT_OVERLOADED)
+
+
+class TokenBucket(object):
+    '''
+    Token bucket (rate tokens per second, up to capacity tokens)
+    '''
+    __slots__ = ('rate', 'capacity', 'tokens', 'stamp')
+
+    def __init__(self, rate, capacity, now):
+        self.rate, self.capacity = rate, capacity
+        self.tokens, self.stamp = float(capacity), now
+
+    def consume(self, now, n=1):
+        '''
+        Takes n tokens from the bucket
+        Returns False if the bucket doesn't contain enough tokens
+        '''
+        self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens < n: return False
+        self.tokens -= n
+        return True
+
+
+class AdmissionController(object):
+    '''
+    Admission controller placed in front of bitid.challenge_valid()
+    '''
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT, reserved_slots=RESERVED_SLOTS, priority_window=PRIORITY_WINDOW,
+                 nonce_ttl=NONCE_TTL, max_nonces=MAX_NONCES, client_rate=CLIENT_RATE, client_burst=CLIENT_BURST,
+                 max_clients=MAX_CLIENTS, clock=time.time):
+        '''
+        Parameters:
+            max_in_flight   = max number of verifications running at the same time
+            reserved_slots  = number of in flight slots reserved for challenges issued less than priority_window seconds ago
+            priority_window = age (in seconds) under which a challenge is given priority
+            nonce_ttl       = lifetime of an issued nonce (in seconds)
+            max_nonces      = max number of nonces tracked (oldest ones are dropped first)
+            client_rate     = number of verifications per second allowed for a client key
+            client_burst    = max burst of verifications for a client key
+            max_clients     = max number of client buckets tracked (least recently used ones are dropped first)
+            clock           = function returning the current time in seconds (optional)
+        '''
+        self.max_in_flight = max_in_flight
+        self.reserved_slots = min(reserved_slots, max_in_flight)
+        self.priority_window = priority_window
+        self.nonce_ttl = nonce_ttl
+        self.max_nonces = max_nonces
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.max_clients = max_clients
+        self.clock = clock
+        self.in_flight = 0
+        self.counters = dict((r, 0) for r in RESULTS)
+        self._nonces = OrderedDict()
+        self._in_flight_nonces = {}
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register_nonce(self, nonce, issued=None):
+        '''
+        Registers a nonce issued by the server
+        Parameters:
+            nonce  = nonce embedded in a bitid uri
+            issued = time when the nonce was issued (optional, default = now). The nonce ttl is counted from this time
+        '''
+        with self._lock:
+            self._nonces.pop(nonce, None)
+            self._nonces[nonce] = self.clock() if issued is None else issued
+            while len(self._nonces) > self.max_nonces: self._nonces.popitem(last=False)
+
+    def issue(self, callback_uri, nonce=None):
+        '''
+        Builds a bitid uri and registers its nonce
+        Returns the bitid uri
+        Parameters:
+            callback_uri = callback uri used as template
+            nonce        = nonce to embed in the bitid uri. If None, a nonce is automatically generated
+        '''
+        if nonce is None: nonce = bitid.generate_nonce()
+        self.register_nonce(nonce)
+        return bitid.build_uri(callback_uri, nonce)
+
+    def admit(self, bitid_uri, client_key=None):
+        '''
+        Checks that a verification can be run (no EC operation)
+        Returns a tuple (ACCEPTED or rejection reason, nonce). An accepted verification must be ended with release()
+        The nonce of an accepted verification can't be admitted again until release()
+        Parameters:
+            bitid_uri  = bitid uri
+            client_key = key identifying the client (ip address, ...) or None to disable rate limiting
+        '''
+        nonce = bitid.extract_nonce(bitid_uri)
+        with self._lock:
+            now = self.clock()
+            if client_key is not None and not self._bucket(client_key, now).consume(now):
+                return self._count(REJECT_RATE_LIMITED), nonce
+            if nonce in self._in_flight_nonces: return self._count(REJECT_IN_FLIGHT), nonce
+            issued = self._nonces.get(nonce)
+            if issued is None: return self._count(REJECT_UNKNOWN), nonce
+            age = now - issued
+            if age > self.nonce_ttl:
+                del self._nonces[nonce]
+                return self._count(REJECT_EXPIRED), nonce
+            limit = self.max_in_flight if age <= self.priority_window else self.max_in_flight - self.reserved_slots
+            if self.in_flight >= limit: return self._count(REJECT_OVERLOADED), nonce
+            self.in_flight += 1
+            self._in_flight_nonces[nonce] = self._nonces.pop(nonce)
+            return ACCEPTED, nonce
+
+    def release(self, nonce, is_valid):
+        '''
+        Ends a verification accepted by admit()
+        A valid nonce is consumed (it can't be used twice). The nonce of an invalid challenge can be used again
+        '''
+        with self._lock:
+            self.in_flight -= 1
+            issued = self._in_flight_nonces.pop(nonce, None)
+            if not is_valid and issued is not None: self._nonces[nonce] = issued
+            self._count(ACCEPTED if is_valid else REJECT_INVALID)
+
+    def check(self, addr, sign, bitid_uri, callback_uri, client_key=None, is_testnet=False):
+        '''
+        Checks data returned by the client through the admission controller
+        Returns ACCEPTED or the reason of the rejection
+        Parameters:
+            addr         = bitcoin address
+            sign         = signature
+            bitid_uri    = bitid uri
+            callback_uri = callback uri used by the website
+            client_key   = key identifying the client (ip address, ...) or None to disable rate limiting
+            is_testnet   = True if validation done for test network, False for main network (optional, default = False)
+        '''
+        result, nonce = self.admit(bitid_uri, client_key)
+        if result != ACCEPTED: return result
+        is_valid = False
+        try:
+            is_valid = bitid.challenge_valid(addr, sign, bitid_uri, callback_uri, is_testnet)
+        finally:
+            self.release(nonce, is_valid)
+        return ACCEPTED if is_valid else REJECT_INVALID
+
+    def challenge_valid(self, addr, sign, bitid_uri, callback_uri, client_key=None, is_testnet=False):
+        '''
+        Same as check() but returns True if the challenge is accepted and valid, False otherwise
+        '''
+        return self.check(addr, sign, bitid_uri, callback_uri, client_key, is_testnet) == ACCEPTED
+
+    def stats(self):
+        '''
+        Returns a dict with the counters per result, the number of verifications in flight and the number of tracked nonces
+        '''
+        with self._lock:
+            stats = dict(self.counters)
+            stats.update(in_flight=self.in_flight, nonces=len(self._nonces), clients=len(self._buckets))
+            return stats
+
+    def _bucket(self, client_key, now):
+        bucket = self._buckets.pop(client_key, None)
+        if bucket is None: bucket = TokenBucket(self.client_rate, self.client_burst, now)
+        self._buckets[client_key] = bucket
+        while len(self._buckets) > self.max_clients: self._buckets.popitem(last=False)
+        return bucket
+
+    def _count(self, result):
+        self.counters[result] += 1
+        return result
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+'''
+Version: 0.0.4
+ASGI app and middleware handling the callbacks posted by wallets (Python 3.5+)
+Usage:
+    app = BitIdASGIMiddleware(app, "https://www.mysite.com/callback", on_login=my_login_function, controller=controller)
+on_login may be a function or a coroutine function.
+'''
+import asyncio
+import inspect
+from pybitid.callback import CallbackHandler, VerifierOverloaded, MAX_BODY_SIZE
+
+
+class BitIdASGIApp(CallbackHandler):
+    '''
+    ASGI app checking the callbacks posted by wallets
+    The event loop is not blocked: signature checks run in the bounded verifier
+    '''
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http": return
+        status, headers, body = await self.handle(scope, receive)
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def handle(self, scope, receive):
+        if scope.get("method") != "POST": return self.response(405, "Method not allowed")
+        body, more_body = b"", True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if len(body) > MAX_BODY_SIZE: return self.response(413, "Request too large")
+        content_type = dict(scope.get("headers") or []).get(b"content-type", b"").decode("latin-1")
+
+        response, fields = self.precheck(body, content_type)
+        if response is not None: return response
+        client = scope.get("client")
+        response, nonce = self.admit(fields, client[0] if client else None)
+        if response is not None: return response
+        is_valid = False
+        try:
+            try:
+                future = self.submit(fields)
+            except VerifierOverloaded:
+                return self.overloaded()
+            is_valid = await asyncio.wrap_future(future)
+        finally:
+            self.release(nonce, is_valid)
+        result = self.login(fields) if is_valid else None
+        if inspect.isawaitable(result): result = await result
+        return self.complete(fields, is_valid, result)
+
+
+class BitIdASGIMiddleware(object):
+    '''
+    ASGI middleware routing the POST requests sent to the callback path to a BitIdASGIApp
+    '''
+    def __init__(self, app, callback_uri, on_login=None, is_testnet=False, verifier=None, controller=None):
+        '''
+        Parameters:
+            app          = wrapped ASGI app
+            callback_uri = callback uri used by the website
+            on_login     = function or coroutine function called with (address, nonce) when a challenge is valid (optional).
+                           The login is refused (401) if it returns False
+            is_testnet   = True if validation done for test network, False for main network (optional, default = False)
+            verifier     = BoundedVerifier used for signature checks (optional)
+            controller   = AdmissionController checking the nonces (optional)
+        '''
+        self.app = app
+        self.callback_app = BitIdASGIApp(callback_uri, on_login, is_testnet, verifier, controller)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope.get("method") == "POST" and scope.get("path") == self.callback_app.callback_path:
+            return await self.callback_app(scope, receive, send)
+        return await self.app(scope, receive, send)
@@ -5,7 +5,6 @@ Functions for a python backend implementation of Bitid protocol
 All string parameters are unicode.
 '''
 import os
-import random
 import time
 import hashlib
 from pybitid import pybitcointools as bittools
@@ -20,17 +19,36 @@ QRCODE_SERV_URI     = "https://chart.googleapis.com/chart?cht=qr&chs=300x300&chl
 # TODO - check what should be the max length of a nonce in bitid
 NONCE_LEN           = 16
 
-try:
-    from urllib import quote
-    import urlparse
-    # Fix for bug in urlparse (see http://bugs.python.org/issue9374)
-    urlparse.uses_netloc.append(BITID_SCHEME)
-    urlparse.uses_query.append(BITID_SCHEME)
-    urlparse.uses_params.append(BITID_SCHEME)
-    urlparse.uses_fragment.append(BITID_SCHEME)
-    from urlparse import urlparse, urlunparse, parse_qs
-except ImportError:
-    from urllib.parse import urlparse, urlunparse, parse_qs, quote
+# Url functions (urlparse, urlunparse, parse_qs, quote), imported on first use
+_URL_FUNCS = []
+
+def url_funcs():
+    '''
+    Returns the url functions (urlparse, urlunparse, parse_qs, quote)
+    Imports are done on first use (costly for cold starts)
+    '''
+    if not _URL_FUNCS:
+        try:
+            from urllib import quote
+            import urlparse
+            # Fix for bug in urlparse (see http://bugs.python.org/issue9374)
+            urlparse.uses_netloc.append(BITID_SCHEME)
+            urlparse.uses_query.append(BITID_SCHEME)
+            urlparse.uses_params.append(BITID_SCHEME)
+            urlparse.uses_fragment.append(BITID_SCHEME)
+            from urlparse import urlparse, urlunparse, parse_qs
+        except ImportError:
+            from urllib.parse import urlparse, urlunparse, parse_qs, quote
+        _URL_FUNCS.extend((urlparse, urlunparse, parse_qs, quote))
+    return _URL_FUNCS
+
+def urlparse(*args, **kwargs): return url_funcs()[0](*args, **kwargs)
+
+def urlunparse(*args, **kwargs): return url_funcs()[1](*args, **kwargs)
+
+def parse_qs(*args, **kwargs): return url_funcs()[2](*args, **kwargs)
+
+def quote(*args, **kwargs): return url_funcs()[3](*args, **kwargs)
 
 
 def build_uri(callback_uri, nonce=None):
@@ -53,7 +71,7 @@ def build_uri(callback_uri, nonce=None):
     return urlunparse((BITID_SCHEME, netloc, path, "", query, ""))
     
 
-def challenge_valid(addr, sign, bitid_uri, callback_uri, is_testnet=False):
+def challenge_valid(addr, sign, bitid_uri, callback_uri, is_testnet=False, registry=None):
     '''
     Checks data returned by the client (address, bitid uri and signature)
     Parameters:
@@ -62,14 +80,15 @@ def challenge_valid(addr, sign, bitid_uri, callback_uri, is_testnet=False):
         bitid_uri    = bitid uri
         callback_uri = callback uri used by the website
         is_test      = True if validation done for test network, False for main network (optional, default = False)        
+        registry     = PubkeyRegistry storing the public keys of returning users (optional)
     '''
     if not address_valid(addr, is_testnet): return False
     if not uri_valid(bitid_uri, callback_uri): return False
-    if not signature_valid(addr, sign, bitid_uri, callback_uri, is_testnet): return False
+    if not signature_valid(addr, sign, bitid_uri, callback_uri, is_testnet, registry): return False
     return True
 
 
-def signature_valid(addr, sign, bitid_uri, callback_uri, is_testnet=False):
+def signature_valid(addr, sign, bitid_uri, callback_uri, is_testnet=False, registry=None):
     '''
     Checks signature against given message and address
     Parameters:
@@ -78,9 +97,10 @@ def signature_valid(addr, sign, bitid_uri, callback_uri, is_testnet=False):
         bitid_uri    = bitid uri
         callback_uri = callback uri used by the website
         is_test      = True if validation done for test network, False for main network (optional, default = False)        
+        registry     = PubkeyRegistry storing the public keys of returning users (optional)
     '''
     try:
-        if not bittools.signature_verify(bitid_uri, sign, addr, is_testnet): return False
+        if not bittools.signature_verify(bitid_uri, sign, addr, is_testnet, registry): return False
     except: 
         return False
     return True
@@ -101,6 +121,20 @@ def extract_nonce(bitid_uri):
         return nonces[0]   
     
 
+def extract_callback(bitid_uri):
+    '''
+    Rebuilds the callback uri embedded in a bitid uri
+    Returns None if the bitid uri is invalid
+    Parameters:
+        bitid_uri = bitid uri
+    '''
+    parsed_bitid = urlparse(bitid_uri)
+    if (parsed_bitid.scheme != BITID_SCHEME) or (not parsed_bitid.netloc) or (not parsed_bitid.path):
+        return None
+    scheme = "http" if extract_unsecure(bitid_uri) == "1" else SECURE_SCHEME
+    return urlunparse((scheme, parsed_bitid.netloc, parsed_bitid.path, "", "", ""))
+    
+
 def qrcode(bitid_uri):
     '''
     Generates a qrcode embedding a bitid uri
@@ -166,7 +200,18 @@ def generate_nonce():
     Inspired from random_key() in https://github.com/vbuterin/pybitcointools/blob/master/bitcoin/main.py 
     Credits to https://github.com/vbuterin    
     '''
+    import random
     entropy = str(os.urandom(32)) + str(random.randrange(2**256)) + str(int(time.time())**7)
     return hashlib.sha256(to_bytes(entropy)).hexdigest()[:NONCE_LEN]
+
+
+def warmup():
+    '''
+    Initializes up front the state otherwise built on first use (imports, hash state, EC tables)
+    For servers which prefer to pay this cost at startup rather than during the first requests
+    '''
+    url_funcs()
+    generate_nonce()
+    bittools.warmup()
     
     
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+'''
+Version: 0.0.4
+Processing of the callbacks posted by wallets (shared by the WSGI and ASGI apps)
+Cheap checks (parsing, address, uri) are done inline. Signature checks are sent to a bounded executor.
+Nonces are checked (issued by the server, not expired, not replayed) by an AdmissionController
+if one is given. Otherwise on_login must check the nonce and return False to refuse the login.
+When the executor is full, callbacks are rejected (503) instead of being queued without limit.
+Requires concurrent.futures (Python 3.2+, or the futures backport for Python 2.7) unless an executor is given.
+'''
+import json
+import threading
+from pybitid import bitid
+from pybitid import admission
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None
+try:
+    from urlparse import urlparse, parse_qs
+except ImportError:
+    from urllib.parse import urlparse, parse_qs
+
+MAX_BODY_SIZE       = 4096
+MAX_WORKERS         = 4
+MAX_PENDING         = 64
+RETRY_AFTER         = "1"
+
+STATUS_LINES        = {
+    200: "200 OK",
+    400: "400 Bad Request",
+    401: "401 Unauthorized",
+    405: "405 Method Not Allowed",
+    413: "413 Request Entity Too Large",
+    429: "429 Too Many Requests",
+    503: "503 Service Unavailable",
+}
+
+
+class VerifierOverloaded(Exception):
+    '''
+    Raised when a verification is submitted to a full verifier
+    '''
+    pass
+
+
+class BoundedVerifier(object):
+    '''
+    Executor accepting a bounded number of pending verifications (queued + running)
+    '''
+    def __init__(self, max_workers=MAX_WORKERS, max_pending=MAX_PENDING, executor=None):
+        '''
+        Parameters:
+            max_workers = number of worker threads (optional, ignored if executor is given)
+            max_pending = max number of verifications queued or running (optional)
+            executor    = concurrent.futures executor (optional, default = ThreadPoolExecutor)
+        '''
+        if executor is None:
+            if ThreadPoolExecutor is None: raise ImportError("concurrent.futures is required (pip install futures on Python 2.7)")
+            executor = ThreadPoolExecutor(max_workers)
+        self.executor = executor
+        self.max_pending = max_pending
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        '''
+        Submits a verification
+        Returns a future. Raises VerifierOverloaded if max_pending verifications are already pending
+        '''
+        if not self._slots.acquire(False):
+            with self._lock: self.rejected += 1
+            raise VerifierOverloaded()
+        try:
+            future = self.executor.submit(fn, *args)
+        except:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._slots.release())
+        return future
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait)
+
+
+class CallbackHandler(object):
+    '''
+    Checks the callbacks posted by wallets (address, signature, uri)
+    '''
+    def __init__(self, callback_uri, on_login=None, is_testnet=False, verifier=None, controller=None):
+        '''
+        Parameters:
+            callback_uri = callback uri used by the website
+            on_login     = function called with (address, nonce) when a challenge is valid (optional).
+                           The login is refused (401) if it returns False
+            is_testnet   = True if validation done for test network, False for main network (optional, default = False)
+            verifier     = BoundedVerifier used for signature checks (optional)
+            controller   = AdmissionController checking the nonces (optional)
+        '''
+        self.callback_uri = callback_uri
+        self.callback_path = urlparse(callback_uri).path
+        self.on_login = on_login
+        self.is_testnet = is_testnet
+        self.verifier = verifier if verifier is not None else BoundedVerifier()
+        self.controller = controller
+
+    def parse(self, body, content_type):
+        '''
+        Parses the body of a callback
+        Returns a tuple (address, signature, uri) or None if the body is invalid
+        Parameters:
+            body         = body of the request (bytes)
+            content_type = content type of the request
+        '''
+        try:
+            text = body.decode("utf-8")
+            if "json" in (content_type or ""):
+                data = json.loads(text)
+                fields = (data["address"], data["signature"], data["uri"])
+            else:
+                data = parse_qs(text)
+                fields = tuple(data[k][0] for k in ("address", "signature", "uri"))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return None
+        if not all(isinstance(f, type(u"")) for f in fields): return None
+        return fields
+
+    def precheck(self, body, content_type):
+        '''
+        Runs the cheap checks of a callback (no EC operation)
+        Returns a tuple (response, None) if the callback is rejected or (None, (address, signature, uri))
+        '''
+        fields = self.parse(body, content_type)
+        if fields is None: return self.response(400, "Invalid request"), None
+        addr, sign, bitid_uri = fields
+        if not bitid.address_valid(addr, self.is_testnet): return self.response(401, "Invalid address"), None
+        if not bitid.uri_valid(bitid_uri, self.callback_uri): return self.response(401, "Invalid uri"), None
+        return None, fields
+
+    def admit(self, fields, client_key=None):
+        '''
+        Checks the nonce of a callback with the admission controller (no EC operation)
+        Returns a tuple (response, None) if the callback is rejected or (None, nonce).
+        An admitted callback must be ended with release()
+        '''
+        if self.controller is None: return None, None
+        result, nonce = self.controller.admit(fields[2], client_key)
+        if result == admission.ACCEPTED: return None, nonce
+        if result == admission.REJECT_OVERLOADED: return self.overloaded(), None
+        if result == admission.REJECT_RATE_LIMITED: return self.response(429, "Too many requests"), None
+        return self.response(401, "Invalid nonce"), None
+
+    def release(self, nonce, is_valid):
+        '''
+        Ends a callback admitted by admit() (a valid nonce is consumed)
+        '''
+        if self.controller is not None and nonce is not None: self.controller.release(nonce, is_valid)
+
+    def submit(self, fields):
+        '''
+        Submits the signature check of a callback to the verifier
+        Returns a future. Raises VerifierOverloaded if the verifier is full
+        '''
+        addr, sign, bitid_uri = fields
+        return self.verifier.submit(bitid.signature_valid, addr, sign, bitid_uri, self.callback_uri, self.is_testnet)
+
+    def login(self, fields):
+        '''
+        Calls on_login for a callback with a valid signature
+        Returns the result of on_login (None if there's no on_login)
+        '''
+        addr, sign, bitid_uri = fields
+        return self.on_login(addr, bitid.extract_nonce(bitid_uri)) if self.on_login else None
+
+    def complete(self, fields, is_valid, login_result=None):
+        '''
+        Builds the response of a callback once its signature is checked and on_login is called
+        '''
+        if not is_valid: return self.response(401, "Invalid signature")
+        if login_result is False: return self.response(401, "Login refused")
+        return self.response(200, "Authenticated", address=fields[0])
+
+    def response(self, status, message, **extra):
+        '''
+        Builds a response
+        Returns a tuple (status code, headers, body)
+        '''
+        payload = dict(extra, message=message)
+        body = json.dumps(payload).encode("utf-8")
+        headers = [("Content-Type", "application/json"), ("Content-Length", str(len(body)))]
+        if status == 503: headers.append(("Retry-After", RETRY_AFTER))
+        return status, headers, body
+
+    def overloaded(self):
+        return self.response(503, "Server overloaded")
@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+'''
+Version: 0.0.4
+Verification daemon (sidecar) listening on a unix domain socket (Python 3.7+)
+Requests arriving within a short window are verified in one batch (shared inversions, amortized IPC).
+Requests received while a batch is verified are grouped in the next batch. When too many requests are pending,
+the daemon stops reading the sockets (back-pressure) until the running batches complete.
+Usage:
+    python -m pybitid.daemon --socket /tmp/pybitid.sock --callback URI [--callback URI ...]
+                             [--window-ms 2] [--max-batch 64] [--max-pending 256] [--jobs N] [--testnet]
+Framing: each message is a 4 bytes big endian length followed by a json payload
+    request  = {"id": ..., "address": ..., "signature": ..., "uri": ..., "callback": ... (optional)}
+    response = {"id": ..., "valid": true|false}
+Callback uris accepted by the daemon are set at startup. A request is valid only if its callback is one of them.
+The callback may be omitted only when the daemon accepts a single callback uri (the callback embedded in the bitid uri
+is never trusted).
+'''
+import sys
+import os
+import json
+import socket
+import struct
+import asyncio
+import argparse
+import binascii
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from pybitid import bitid
+from pybitid import pybitcointools as bittools
+from pybitid.pysix import to_bytes
+
+HEADER              = struct.Struct(">I")
+MAX_FRAME_SIZE      = 65536
+BATCH_WINDOW        = 0.002
+MAX_BATCH           = 64
+MAX_PENDING         = 256
+
+
+def encode_frame(obj):
+    '''
+    Encodes a message (length prefix + json payload)
+    '''
+    payload = json.dumps(obj, separators=(",", ":")).encode("utf-8")
+    return HEADER.pack(len(payload)) + payload
+
+
+def verify_batch(requests, callbacks, is_testnet=False):
+    '''
+    Checks a batch of requests (cheap checks first, then one batch verification of the signatures)
+    Returns a list of booleans
+    Parameters:
+        requests   = list of requests (dicts with address, signature, uri and callback)
+        callbacks  = callback uris accepted by the daemon. The callback of a request is optional if there's only one
+        is_testnet = True if validation done for test network, False for main network (optional, default = False)
+    '''
+    default_callback = next(iter(callbacks)) if len(callbacks) == 1 else None
+    results = [False] * len(requests)
+    items, indexes = [], []
+    for i, req in enumerate(requests):
+        try:
+            addr, sign, bitid_uri = req["address"], req["signature"], req["uri"]
+            callback_uri = req.get("callback") or default_callback
+            if callback_uri not in callbacks: continue
+            if not bitid.address_valid(addr, is_testnet): continue
+            if not bitid.uri_valid(bitid_uri, callback_uri): continue
+            vbyte, h160 = bittools.b58check_to_bin(to_bytes(addr))
+            items.append((to_bytes(bitid_uri), binascii.a2b_base64(to_bytes(sign)), h160, vbyte))
+            indexes.append(i)
+        except Exception:
+            continue
+    for i, res in zip(indexes, bittools.bin_signature_verify_many(items)):
+        results[i] = res.valid
+    return results
+
+
+class BatchingServer(object):
+    '''
+    Unix socket server grouping the requests received within a window in one batch verification
+    '''
+    def __init__(self, path, callbacks, window=BATCH_WINDOW, max_batch=MAX_BATCH, max_pending=MAX_PENDING,
+                 is_testnet=False, executor=None, max_running=1):
+        '''
+        Parameters:
+            path        = path of the unix socket
+            callbacks   = list of callback uris accepted by the daemon
+            window      = max time (in seconds) a request waits for other requests before its batch is verified
+            max_batch   = max number of requests in a batch
+            max_pending = max number of requests waiting for a batch. Beyond, the sockets aren't read anymore
+            is_testnet  = True if validation done for test network, False for main network (optional, default = False)
+            executor    = executor running the batch verifications (optional, default = one worker thread)
+            max_running = max number of batches verified at the same time (should match the workers of the executor)
+        '''
+        if not callbacks: raise ValueError("Missing parameter: callbacks")
+        self.path = path
+        self.callbacks = frozenset(callbacks)
+        self.window = window
+        self.max_batch = max_batch
+        self.max_pending = max(max_pending, max_batch)
+        self.is_testnet = is_testnet
+        self.executor = executor if executor is not None else ThreadPoolExecutor(1)
+        self.max_running = max_running
+        self.stats = {"requests": 0, "batches": 0, "max_batch": 0, "malformed": 0, "throttled": 0}
+        self._pending = []
+        self._running = 0
+        self._timer = None
+        self._server = None
+        self._space = None
+        self._connections = {}
+
+    async def start(self):
+        if os.path.exists(self.path): os.remove(self.path)
+        self._space = asyncio.Event()
+        self._space.set()
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def close(self):
+        '''
+        Stops accepting connections and closes the open ones
+        '''
+        if self._timer is not None: self._timer.cancel()
+        if self._server is not None: self._server.close()
+        for writer in list(self._connections.values()): writer.close()
+        if os.path.exists(self.path): os.remove(self.path)
+
+    async def wait_closed(self):
+        '''
+        Waits for the end of the connection handlers (after close())
+        '''
+        if self._connections: await asyncio.wait(list(self._connections))
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        # Responses are written in order by a dedicated task (waiting for the socket to drain)
+        responses = asyncio.Queue(self.max_batch)
+        sender = asyncio.ensure_future(self._send(responses, writer))
+        try:
+            while True:
+                header = await reader.readexactly(HEADER.size)
+                size = HEADER.unpack(header)[0]
+                if size > MAX_FRAME_SIZE: break
+                payload = await reader.readexactly(size)
+                try:
+                    req = json.loads(payload.decode("utf-8"))
+                    if not isinstance(req, dict): raise ValueError()
+                except ValueError:
+                    self.stats["malformed"] += 1
+                    await responses.put((None, None))
+                    continue
+                if len(self._pending) >= self.max_pending:
+                    # Back-pressure: stops reading until the pending requests are sent to a batch
+                    self.stats["throttled"] += 1
+                    while len(self._pending) >= self.max_pending:
+                        self._space.clear()
+                        await self._space.wait()
+                await responses.put((req.get("id"), self._enqueue(req)))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            await responses.put(None)
+            await sender
+            writer.close()
+            del self._connections[task]
+
+    async def _send(self, responses, writer):
+        connected = True
+        while True:
+            item = await responses.get()
+            if item is None: return
+            req_id, future = item
+            if future is None:
+                response = {"id": None, "valid": False, "error": "malformed"}
+            else:
+                response = {"id": req_id, "valid": await future}
+            if not connected: continue
+            try:
+                writer.write(encode_frame(response))
+                await writer.drain()
+            except ConnectionError:
+                connected = False
+
+    def _enqueue(self, req):
+        self.stats["requests"] += 1
+        future = asyncio.get_event_loop().create_future()
+        self._pending.append((req, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None and self._running < self.max_running:
+            self._timer = asyncio.get_event_loop().call_later(self.window, self._flush)
+        return future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # Requests received while max_running batches are verified wait for the end of a batch
+        while self._pending and self._running < self.max_running:
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            self._running += 1
+            self.stats["batches"] += 1
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+            requests = [req for req, future in batch]
+            future = asyncio.get_event_loop().run_in_executor(self.executor, verify_batch, requests, self.callbacks, self.is_testnet)
+            future.add_done_callback(lambda f, batch=batch: self._done(batch, f))
+        if len(self._pending) < self.max_pending: self._space.set()
+
+    def _done(self, batch, future):
+        self._running -= 1
+        results = future.result() if future.exception() is None else [False] * len(batch)
+        for (req, f), valid in zip(batch, results):
+            if not f.done(): f.set_result(valid)
+        # Requests accumulated during the verification are sent at once
+        self._flush()
+
+
+class DaemonClient(object):
+    '''
+    Blocking client of the verification daemon
+    '''
+    def __init__(self, path, timeout=None):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(path)
+        self._next_id = 0
+
+    def verify(self, addr, sign, bitid_uri, callback_uri=None):
+        '''
+        Checks a challenge (see bitid.challenge_valid)
+        Returns True if the challenge is valid
+        callback_uri may be omitted only if the daemon accepts a single callback uri
+        '''
+        self._next_id += 1
+        req = {"id": self._next_id, "address": addr, "signature": sign, "uri": bitid_uri}
+        if callback_uri is not None: req["callback"] = callback_uri
+        self.sock.sendall(encode_frame(req))
+        return self.receive()["valid"]
+
+    def receive(self):
+        size = HEADER.unpack(self._read(HEADER.size))[0]
+        return json.loads(self._read(size).decode("utf-8"))
+
+    def close(self):
+        self.sock.close()
+
+    def _read(self, size):
+        data = b""
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk: raise ConnectionError("Connection closed by the daemon")
+            data += chunk
+        return data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m pybitid.daemon', description='Batching bitid verification daemon')
+    parser.add_argument('-s', '--socket', required=True, help='path of the unix socket')
+    parser.add_argument('-c', '--callback', action='append', required=True, help='callback uri accepted by the daemon (repeatable)')
+    parser.add_argument('-w', '--window-ms', type=float, default=BATCH_WINDOW * 1000, help='batching window (in milliseconds)')
+    parser.add_argument('-b', '--max-batch', type=int, default=MAX_BATCH, help='max number of requests per batch')
+    parser.add_argument('-p', '--max-pending', type=int, default=MAX_PENDING, help='max number of requests waiting for a batch')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='number of worker processes (1 = worker thread)')
+    parser.add_argument('-t', '--testnet', action='store_true', help='validates requests for the testnet')
+    args = parser.parse_args(argv)
+
+    executor = ProcessPoolExecutor(args.jobs) if args.jobs > 1 else None
+    server = BatchingServer(args.socket, args.callback, args.window_ms / 1000.0, args.max_batch, args.max_pending,
+                            args.testnet, executor, max(1, args.jobs))
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
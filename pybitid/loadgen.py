@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+'''
+Version: 0.0.4
+Load generator for the verification daemon (reports p50 / p99 latencies and throughput)
+Usage:
+    python -m pybitid.loadgen [--socket PATH] [--clients N] [--requests N] [--window-ms N] [--max-batch N]
+Without --socket, a daemon accepting CALLBACK_URI is started in-process on a temporary socket.
+'''
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+from pybitid.daemon import BatchingServer, encode_frame, HEADER, BATCH_WINDOW, MAX_BATCH
+from pybitid.tests import CALLBACK_URI, BITID_URI, ADDRESS, SIGNATURE
+
+CLIENTS             = 16
+REQUESTS            = 50
+
+# Valid challenge used as request (shared test data)
+REQUEST             = {"address": ADDRESS, "signature": SIGNATURE, "uri": BITID_URI, "callback": CALLBACK_URI}
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+
+async def client(path, requests, latencies, failures):
+    reader, writer = await asyncio.open_unix_connection(path)
+    try:
+        for i in range(requests):
+            start = time.time()
+            writer.write(encode_frame(dict(REQUEST, id=i)))
+            size = HEADER.unpack(await reader.readexactly(HEADER.size))[0]
+            res = json.loads((await reader.readexactly(size)).decode("utf-8"))
+            latencies.append(time.time() - start)
+            if not res["valid"]: failures.append(res)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def run(path=None, clients=CLIENTS, requests=REQUESTS, window=BATCH_WINDOW, max_batch=MAX_BATCH):
+    '''
+    Runs the load test
+    Returns a report (dict with requests, failures, throughput, p50 / p99 latencies in ms and daemon stats)
+    Parameters:
+        path      = path of the daemon socket (None = in-process daemon)
+        clients   = number of concurrent clients
+        requests  = number of requests per client
+        window    = batching window of the in-process daemon (in seconds)
+        max_batch = max batch size of the in-process daemon
+    '''
+    server, tmpdir = None, None
+    if path is None:
+        tmpdir = tempfile.mkdtemp()
+        path = os.path.join(tmpdir, "pybitid.sock")
+        server = BatchingServer(path, [CALLBACK_URI], window, max_batch)
+        await server.start()
+    latencies, failures = [], []
+    try:
+        start = time.time()
+        await asyncio.gather(*[client(path, requests, latencies, failures) for i in range(clients)])
+        elapsed = time.time() - start
+    finally:
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+        if tmpdir is not None: shutil.rmtree(tmpdir)
+    return {
+        "requests": len(latencies),
+        "failures": len(failures),
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "daemon": dict(server.stats) if server is not None else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m pybitid.loadgen', description='Load generator for the verification daemon')
+    parser.add_argument('-s', '--socket', default=None, help='path of the daemon socket (default = in-process daemon)')
+    parser.add_argument('-c', '--clients', type=int, default=CLIENTS, help='number of concurrent clients')
+    parser.add_argument('-n', '--requests', type=int, default=REQUESTS, help='number of requests per client')
+    parser.add_argument('-w', '--window-ms', type=float, default=BATCH_WINDOW * 1000, help='batching window of the in-process daemon')
+    parser.add_argument('-b', '--max-batch', type=int, default=MAX_BATCH, help='max batch size of the in-process daemon')
+    args = parser.parse_args(argv)
+    report = asyncio.run(run(args.socket, args.clients, args.requests, args.window_ms / 1000.0, args.max_batch))
+    sys.stdout.write(json.dumps(report, sort_keys=True) + "\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
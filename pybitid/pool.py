@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+'''
+Version: 0.0.4
+Pool of pre-generated challenges for a callback site
+A background thread keeps a bounded queue of ready-to-serve challenges (nonce, bitid uri, qrcode uri)
+so that generate_nonce(), build_uri() and qrcode() are run outside of the request path.
+Usage:
+    pool = ChallengePool(callback_uri)
+    pool.start()
+    ...
+    challenge = pool.get()    # challenge.nonce, challenge.uri, challenge.qrcode, challenge.expires
+    ...
+    pool.close()
+'''
+import time
+import threading
+from collections import deque, namedtuple
+from pybitid import bitid
+
+POOL_SIZE           = 256
+LOW_WATER           = 64
+CHALLENGE_TTL       = 600
+
+
+# A pre-generated challenge (expires = time after which the challenge mustn't be served)
+Challenge = namedtuple('Challenge', ('nonce', 'uri', 'qrcode', 'expires'))
+
+
+class ChallengePool(object):
+    '''
+    Bounded queue of pre-generated challenges for a callback uri, topped up by a background thread
+    Challenges are served oldest first. Challenges with less than min_ttl seconds to live are dropped (the user needs time to scan
+    and sign the challenge). An empty pool generates a challenge on the request path (miss)
+    '''
+    def __init__(self, callback_uri, size=POOL_SIZE, low_water=LOW_WATER, ttl=CHALLENGE_TTL, min_ttl=None,
+                 controller=None, clock=time.time):
+        '''
+        Parameters:
+            callback_uri = callback uri used as template
+            size         = max number of challenges kept in the pool
+            low_water    = the pool is topped up when it contains less than low_water challenges
+            ttl          = lifetime of a pre-generated challenge (in seconds)
+            min_ttl      = min remaining lifetime of a served challenge (in seconds, default = ttl / 2)
+            controller   = AdmissionController registering the nonces when they are served, with their generation time (optional)
+            clock        = function returning the current time in seconds (optional)
+        '''
+        bitid.build_uri(callback_uri, "0")
+        self.callback_uri = callback_uri
+        self.size = size
+        self.low_water = min(low_water, size)
+        self.ttl = ttl
+        self.min_ttl = ttl / 2.0 if min_ttl is None else min(min_ttl, ttl)
+        self.controller = controller
+        self.clock = clock
+        self.counters = {"hits": 0, "misses": 0, "expired": 0, "generated": 0}
+        self.refill_lag = 0.0
+        self.max_refill_lag = 0.0
+        self._queue = deque()
+        self._refill_requested = None
+        self._cond = threading.Condition(threading.Lock())
+        self._thread = None
+        self._stopped = False
+
+    def start(self):
+        '''
+        Fills the pool and starts the background thread
+        '''
+        self.fill()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="pybitid-challenge-pool")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def close(self):
+        '''
+        Stops the background thread
+        '''
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def get(self):
+        '''
+        Returns a challenge (taken from the pool or generated if the pool is empty)
+        '''
+        challenge = None
+        with self._cond:
+            now = self.clock()
+            self._purge(now)
+            if self._queue: challenge = self._queue.popleft()
+            self.counters["hits" if challenge is not None else "misses"] += 1
+            if len(self._queue) < self.low_water:
+                if self._refill_requested is None: self._refill_requested = now
+                self._cond.notify()
+        if challenge is None: challenge = self._generate()
+        if self.controller is not None: self.controller.register_nonce(challenge.nonce, challenge.expires - self.ttl)
+        return challenge
+
+    def fill(self):
+        '''
+        Drops the challenges close to expiration and tops up the pool (run by the background thread)
+        Returns the number of challenges generated
+        '''
+        count = 0
+        with self._cond:
+            self._purge(self.clock())
+            missing = self.size - len(self._queue)
+        while missing > 0:
+            challenges = [self._generate() for i in range(min(missing, self.low_water or 1))]
+            with self._cond:
+                self._queue.extend(challenges)
+                missing = self.size - len(self._queue)
+            count += len(challenges)
+        with self._cond:
+            self.counters["generated"] += count
+            if self._refill_requested is not None:
+                self.refill_lag = max(0.0, self.clock() - self._refill_requested)
+                self.max_refill_lag = max(self.max_refill_lag, self.refill_lag)
+                self._refill_requested = None
+        return count
+
+    def stats(self):
+        '''
+        Returns a dict with the counters (hits, misses, expired, generated), the hit rate,
+        the number of challenges available and the refill lags (last and max, in ms)
+        '''
+        with self._cond:
+            stats = dict(self.counters)
+            served = stats["hits"] + stats["misses"]
+            stats.update(available=len(self._queue),
+                         hit_rate=float(stats["hits"]) / served if served else 1.0,
+                         refill_lag_ms=self.refill_lag * 1000,
+                         max_refill_lag_ms=self.max_refill_lag * 1000)
+            return stats
+
+    def _generate(self):
+        nonce = bitid.generate_nonce()
+        uri = bitid.build_uri(self.callback_uri, nonce)
+        return Challenge(nonce, uri, bitid.qrcode(uri), self.clock() + self.ttl)
+
+    def _purge(self, now):
+        while self._queue and self._queue[0].expires - now < self.min_ttl:
+            self._queue.popleft()
+            self.counters["expired"] += 1
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped and len(self._queue) >= self.low_water:
+                    # Wakes up when the oldest challenge must be dropped (or when a refill is requested)
+                    timeout = self._queue[0].expires - self.min_ttl - self.clock() if self._queue else None
+                    if timeout is not None and timeout <= 0: break
+                    self._cond.wait(timeout)
+                if self._stopped: return
+            self.fill()
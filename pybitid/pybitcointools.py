@@ -6,7 +6,7 @@ This library is a subset of original code developed by Vitalik Buterin for pybit
   (https://github.com/vbuterin/pybitcointools/blob/master/bitcoin/main.py) 
 Code has been adapted for compatibility with Python 2.7 / 3.3
 '''
-import hashlib, re, base64, binascii
+import sys, hashlib, binascii
 from pybitid.pysix import b2i, i2b, to_bytes
 
 
@@ -20,6 +20,16 @@ Gx = 550662630222773436695787188951685343262506034537775941755001873603891167292
 Gy = 32670510020758816978083085130507043184471273380659243275938904335757337482424
 G = (Gx,Gy)
 
+# Default max number of public keys stored in a PubkeyRegistry
+PUBKEY_REGISTRY_SIZE = 100000
+
+# Windows of the wnaf multiplications (G, cached public keys, other points)
+G_WINDOW = 8
+CACHED_WINDOW = 8
+DEFAULT_WINDOW = 4
+# Default max memory used by a PrecomputeCache (in bytes)
+PRECOMPUTE_CACHE_SIZE = 64 * 1024 * 1024
+
 
 ### Extended Euclidean Algorithm
 
@@ -35,13 +45,18 @@ def inv(a,n):
 
 ### Base switching
 
+_CODE_STRING_256 = []
+
 def get_code_string(base):
     if base == 2: return '01'
     elif base == 10: return b'0123456789'
     elif base == 16: return b'0123456789abcdef'
     elif base == 32: return b'abcdefghijklmnopqrstuvwxyz234567'
     elif base == 58: return b'123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
-    elif base == 256: return b''.join([i2b(x) for x in range(256)])
+    elif base == 256:
+        # Built on first use
+        if not _CODE_STRING_256: _CODE_STRING_256.append(b''.join([i2b(x) for x in range(256)]))
+        return _CODE_STRING_256[0]
     else: raise ValueError("Invalid base!")
 
 def lpad(msg,symbol,length):
@@ -50,6 +65,11 @@ def lpad(msg,symbol,length):
 
 def encode(val,base,minlen=0):
     base, minlen = int(base), int(minlen)
+    if base == 256 or base == 16:
+        # Fast path (hex conversion done by the interpreter)
+        hexval = '%x' % val if val > 0 else ''
+        if base == 16: return lpad(to_bytes(hexval), b'0', minlen)
+        return lpad(binascii.unhexlify(to_bytes('0' * (len(hexval) % 2) + hexval)), b'\x00', minlen)
     code_string = get_code_string(base)
     result = b''   
     while val > 0:
@@ -60,13 +80,12 @@ def encode(val,base,minlen=0):
 
 def decode(string,base):
     base = int(base)
+    if base == 256: return int(binascii.hexlify(string), 16) if string else 0
     code_string = get_code_string(base)
     result = 0
     if base == 16: string = string.lower()
-    while len(string) > 0:
-        result *= base
-        result += code_string.find(string[0])
-        string = string[1:]
+    for c in string:
+        result = result * base + code_string.find(c)
     return result
 
 def changebase(string,frm,to,minlen=0):
@@ -78,30 +97,142 @@ def changebase(string,frm,to,minlen=0):
 
 def isinf(p): return p[0] == 0 and p[1] == 0
 
+# Jacobian coordinates (x, y, z) <=> affine coordinates (x/z^2, y/z^3). Point at infinity has z = 0.
+JACOBIAN_INF = (0, 1, 0)
+
+def to_jacobian(p):
+    return JACOBIAN_INF if isinf(p) else (p[0], p[1], 1)
+
+def from_jacobian(p):
+    if not p[2]: return (0,0)
+    z = inv(p[2], P)
+    zz = (z * z) % P
+    return ((p[0] * zz) % P, (p[1] * zz * z) % P)
+
+def jacobian_double(p):
+    if not p[2] or not p[1]: return JACOBIAN_INF
+    ysq = (p[1] * p[1]) % P
+    S = (4 * p[0] * ysq) % P
+    M = (3 * p[0] * p[0]) % P
+    nx = (M * M - 2 * S) % P
+    ny = (M * (S - nx) - 8 * ysq * ysq) % P
+    nz = (2 * p[1] * p[2]) % P
+    return (nx, ny, nz)
+
+def jacobian_add(p,q):
+    if not p[2]: return q
+    if not q[2]: return p
+    pz2, qz2 = (p[2] * p[2]) % P, (q[2] * q[2]) % P
+    U1, U2 = (p[0] * qz2) % P, (q[0] * pz2) % P
+    S1, S2 = (p[1] * qz2 * q[2]) % P, (q[1] * pz2 * p[2]) % P
+    if U1 == U2:
+        if S1 != S2: return JACOBIAN_INF
+        return jacobian_double(p)
+    H, R = U2 - U1, S2 - S1
+    H2 = (H * H) % P
+    H3 = (H * H2) % P
+    U1H2 = (U1 * H2) % P
+    nx = (R * R - H3 - 2 * U1H2) % P
+    ny = (R * (U1H2 - nx) - S1 * H3) % P
+    nz = (H * p[2] * q[2]) % P
+    return (nx, ny, nz)
+
+def jacobian_multiply(a,n):
+    n = n % N
+    if not a[2] or n == 0: return JACOBIAN_INF
+    result = JACOBIAN_INF
+    for bit in bin(n)[2:]:
+        result = jacobian_double(result)
+        if bit == '1': result = jacobian_add(result, a)
+    return result
+
+def jacobian_shamir(a,m,b,n):
+    # m*a + n*b computed with a single chain of doublings (Shamir's trick)
+    m, n = m % N, n % N
+    ab = jacobian_add(a, b)
+    result = JACOBIAN_INF
+    for i in range(max(m.bit_length(), n.bit_length()) - 1, -1, -1):
+        result = jacobian_double(result)
+        bm, bn = (m >> i) & 1, (n >> i) & 1
+        if bm and bn: result = jacobian_add(result, ab)
+        elif bm: result = jacobian_add(result, a)
+        elif bn: result = jacobian_add(result, b)
+    return result
+
+def batch_inv(values,n):
+    # Inverses of non zero values mod n with a single inversion (Montgomery's trick)
+    prods, acc = [], 1
+    for v in values:
+        prods.append(acc)
+        acc = (acc * v) % n
+    acc = inv(acc, n)
+    result = [0] * len(values)
+    for i in range(len(values) - 1, -1, -1):
+        result[i] = (acc * prods[i]) % n
+        acc = (acc * values[i]) % n
+    return result
+
+def batch_normalize(points):
+    # Converts jacobian points (not at infinity) to z = 1 with a single inversion
+    result = []
+    for (x, y, z), zinv in zip(points, batch_inv([p[2] for p in points], P)):
+        zz = (zinv * zinv) % P
+        result.append(((x * zz) % P, (y * zz * zinv) % P, 1))
+    return result
+
+def odd_multiples(a,w,normalize=True):
+    # Table [a, 3a, 5a, ..., (2^(w-1)-1)a] used by wnaf multiplications (a must not be the point at infinity)
+    a2 = jacobian_double(a)
+    table = [a]
+    for i in range((1 << (w - 2)) - 1): table.append(jacobian_add(table[-1], a2))
+    return batch_normalize(table) if normalize else table
+
+def wnaf(n,w):
+    # Width-w non adjacent form of n (least significant digit first)
+    digits, half, full = [], 1 << (w - 1), 1 << w
+    while n:
+        d = 0
+        if n & 1:
+            d = n & (full - 1)
+            if d >= half: d -= full
+            n -= d
+        digits.append(d)
+        n >>= 1
+    return digits
+
+def jacobian_wnaf_multiply(terms):
+    # Sum of n*a for terms (odd multiples table of a, window w, n), with a single chain of doublings
+    nafs = [(table, wnaf(n % N, w)) for table, w, n in terms]
+    result = JACOBIAN_INF
+    for i in range(max(len(naf) for table, naf in nafs) - 1, -1, -1):
+        result = jacobian_double(result)
+        for table, naf in nafs:
+            if i < len(naf) and naf[i]:
+                d = naf[i]
+                if d > 0:
+                    result = jacobian_add(result, table[d >> 1])
+                else:
+                    x, y, z = table[(-d) >> 1]
+                    result = jacobian_add(result, (x, P - y, z))
+    return result
+
+_G_TABLE = []
+
+def generator_table():
+    # Odd multiples of G (computed on first use)
+    if not _G_TABLE: _G_TABLE.extend(odd_multiples(to_jacobian(G), G_WINDOW))
+    return _G_TABLE
+
 def base10_add(a,b):
-    if isinf(a): return b[0],b[1]
-    if isinf(b): return a[0],a[1]
-    if a[0] == b[0]: 
-        if a[1] == b[1]: return base10_double((a[0],a[1]))
-        else: return (0,0)
-    m = ((b[1]-a[1]) * inv(b[0]-a[0],P)) % P
-    x = (m*m-a[0]-b[0]) % P
-    y = (m*(a[0]-x)-a[1]) % P
-    return (x,y)
+    return from_jacobian(jacobian_add(to_jacobian(a), to_jacobian(b)))
 
 def base10_double(a):
-    if isinf(a): return (0,0)
-    m = ((3*a[0]*a[0]+A)*inv(2*a[1],P)) % P
-    x = (m*m-2*a[0]) % P
-    y = (m*(a[0]-x)-a[1]) % P
-    return (x,y)
+    return from_jacobian(jacobian_double(to_jacobian(a)))
 
 def base10_multiply(a,n):
-    if isinf(a) or n == 0: return (0,0)
+    if isinf(a) or n % N == 0: return (0,0)
     if n == 1: return a
-    if n < 0 or n >= N: return base10_multiply(a,n%N)
-    if (n%2) == 0: return base10_double(base10_multiply(a,n//2))
-    if (n%2) == 1: return base10_add(base10_double(base10_multiply(a,n//2)),a)
+    return from_jacobian(jacobian_multiply(to_jacobian(a), n))
 
 
 # Functions for handling pubkey and privkey formats
@@ -151,9 +282,28 @@ def neg_pubkey(pubkey):
 
 ### Hashes
 
+# RIPEMD-160 function (hashlib or pure python fallback), selected on first use
+_RIPEMD160 = []
+
+def ripemd160_backend():
+    if not _RIPEMD160:
+        try:
+            hashlib.new('ripemd160', b'')
+            _RIPEMD160.append(lambda x: hashlib.new('ripemd160', x).digest())
+        except ValueError:
+            # Not provided by hashlib (e.g. OpenSSL 3 without the legacy provider)
+            from pybitid.ripemd160 import ripemd160
+            _RIPEMD160.append(ripemd160)
+    return _RIPEMD160[0]
+
 def bin_hash160(string):
     intermed = hashlib.sha256(string).digest()
-    return hashlib.new('ripemd160',intermed).digest()
+    return ripemd160_backend()(intermed)
+
+def hash160_many(strings):
+    ripemd160 = ripemd160_backend()
+    sha256 = hashlib.sha256
+    return [ripemd160(sha256(s).digest()) for s in strings]
 def bin_dbl_sha256(string):
     return hashlib.sha256(hashlib.sha256(string).digest()).digest()
 
@@ -168,21 +318,33 @@ def num_to_var_int(x):
     elif x < 4294967296: return i2b(254) + encode(x,256,4)[::-1]
     else: return i2b(255) + encode(x,256,8)[::-1]
 
+# SHA256 state pre-fed with the constant prefix of signed messages (built on first use, cloned for each message)
+_MSG_PREFIX_SHA256 = []
+
+def msg_prefix_sha256():
+    if not _MSG_PREFIX_SHA256: _MSG_PREFIX_SHA256.append(hashlib.sha256(b'\x18Bitcoin Signed Message:\n'))
+    return _MSG_PREFIX_SHA256[0]
+
 def electrum_sig_hash(message):
-    padded = b'\x18Bitcoin Signed Message:\n' + num_to_var_int(len(message)) + message
-    return bin_dbl_sha256(padded)
+    h = msg_prefix_sha256().copy()
+    h.update(num_to_var_int(len(message)))
+    h.update(message)
+    return hashlib.sha256(h.digest()).digest()
+
+def electrum_sig_hashes(messages):
+    return [electrum_sig_hash(m) for m in messages]
 
 
 ### Encodings
 
 def bin_to_b58check(inp,magicbyte=0):
     inp_fmtd = i2b(magicbyte) + inp
-    leadingzbytes = len(re.match(b'^\x00*',inp_fmtd).group(0))
+    leadingzbytes = len(inp_fmtd) - len(inp_fmtd.lstrip(b'\x00'))
     checksum = bin_dbl_sha256(inp_fmtd)[:4]
     return b'1' * leadingzbytes + changebase(inp_fmtd+checksum,256,58)
 
 def get_version_byte(inp):
-    leadingzbytes = len(re.match(b'^1*',inp).group(0))
+    leadingzbytes = len(inp) - len(inp.lstrip(b'1'))
     data = b'\x00' * leadingzbytes + changebase(inp,58,256)
     assert bin_dbl_sha256(data[:-4])[:4] == data[-4:]
     return b2i(data[0])
@@ -199,34 +361,293 @@ pubtoaddr = pubkey_to_address
 def pubbyte_prefix(istest):
     return 111 if istest else 0
 
+def b58check_to_bin(inp):
+    leadingzbytes = len(inp) - len(inp.lstrip(b'1'))
+    data = b'\x00' * leadingzbytes + changebase(inp,58,256)
+    assert len(data) > 4 and bin_dbl_sha256(data[:-4])[:4] == data[-4:]
+    return b2i(data[0]), data[1:-4]
+
+
+### Point, public key and signature types
+
+class Point(object):
+    '''
+    Point of secp256k1 stored in jacobian coordinates
+    Affine coordinates are computed (one inversion) and cached on first use
+    '''
+    __slots__ = ('jac', '_xy')
+
+    def __init__(self, x, y, z=1):
+        self.jac = (x, y, z)
+        self._xy = (x, y) if z == 1 else ((0, 0) if z == 0 else None)
+
+    @classmethod
+    def from_tuple(cls, p):
+        return cls(*to_jacobian(p))
+
+    @property
+    def xy(self):
+        if self._xy is None: self._xy = from_jacobian(self.jac)
+        return self._xy
+
+    @property
+    def x(self): return self.xy[0]
+
+    @property
+    def y(self): return self.xy[1]
+
+    def is_inf(self): return not self.jac[2]
+
+    def on_curve(self):
+        x, y = self.xy
+        return (y * y - x * x * x - B) % P == 0
+
+    def __add__(self, other): return Point(*jacobian_add(self.jac, other.jac))
+
+    def __neg__(self): return Point(self.jac[0], (P - self.jac[1]) % P, self.jac[2])
+
+    def __mul__(self, n): return Point(*jacobian_multiply(self.jac, n))
+
+    __rmul__ = __mul__
+
+    def mul_add(self, m, other, n):
+        '''
+        Returns m*self + n*other (one combined multiplication)
+        '''
+        return Point(*jacobian_shamir(self.jac, m, other.jac, n))
+
+    def __eq__(self, other): return isinstance(other, Point) and self.xy == other.xy
+
+    def __ne__(self, other): return not self == other
+
+    def __hash__(self): return hash(self.xy)
+
+    def __repr__(self): return 'Point(%d, %d)' % self.xy
+
+GPOINT = Point(Gx, Gy)
+
+
+class PublicKey(object):
+    '''
+    Public key (point + compression flag)
+    Serializations and hash160 are computed and cached on first use
+    '''
+    __slots__ = ('point', 'compressed', '_bin', '_bin_compressed', '_hash160')
+
+    def __init__(self, point, compressed=False):
+        self.point = point
+        self.compressed = compressed
+        self._bin = self._bin_compressed = self._hash160 = None
+
+    @classmethod
+    def parse(cls, pub):
+        if isinstance(pub, PublicKey): return pub
+        if isinstance(pub, Point): return cls(pub)
+        formt = get_pubkey_format(pub)
+        return cls(Point.from_tuple(decode_pubkey(pub, formt)), formt in ('bin_compressed', 'hex_compressed'))
+
+    def serialize(self, compressed=None):
+        if compressed is None: compressed = self.compressed
+        if compressed:
+            if self._bin_compressed is None:
+                x, y = self.point.xy
+                self._bin_compressed = i2b(2 + (y % 2)) + encode(x, 256, 32)
+            return self._bin_compressed
+        if self._bin is None:
+            x, y = self.point.xy
+            self._bin = b'\x04' + encode(x, 256, 32) + encode(y, 256, 32)
+        return self._bin
+
+    def hash160(self):
+        if self._hash160 is None: self._hash160 = bin_hash160(self.serialize())
+        return self._hash160
+
+    def address(self, magicbyte=0):
+        return bin_to_b58check(self.hash160(), magicbyte)
+
+    def to_tuple(self): return self.point.xy
+
+    def __eq__(self, other): return isinstance(other, PublicKey) and self.serialize() == other.serialize()
+
+    def __ne__(self, other): return not self == other
+
+    def __hash__(self): return hash(self.serialize())
+
+
+class Signature(object):
+    '''
+    Compact signature (header byte v, r, s)
+    '''
+    __slots__ = ('v', 'r', 's')
+
+    def __init__(self, v, r, s):
+        self.v, self.r, self.s = v, r, s
+
+    @classmethod
+    def from_bin(cls, sig):
+        return cls(b2i(sig[0]), decode(sig[1:33],256), decode(sig[33:65],256))
+
+    @classmethod
+    def from_base64(cls, sig):
+        return cls.from_bin(binascii.a2b_base64(sig))
+
+    @property
+    def compressed(self): return 31 <= self.v < 35
+
+    def to_tuple(self): return (self.v, self.r, self.s)
+
+    def verify(self, msghash, pub, strict=False, tables=None):
+        '''
+        Checks the signature of a message hash for a public key (PublicKey, Point or any pubkey format)
+        If strict is True, also checks the parity of R encoded in the header byte
+        (i.e. accepts exactly the signatures for which recover() returns this public key)
+        tables is an optional PrecomputeCache providing the precomputed multiples of the public key
+        '''
+        r, s = self.r, self.s
+        if not (0 < r < N and 0 < s < N): return False
+        Q = pub.point if isinstance(pub, PublicKey) else (pub if isinstance(pub, Point) else Point.from_tuple(decode_pubkey(pub)))
+        if Q.is_inf(): return False
+        if tables is not None:
+            qtable, qwindow = tables.get(Q), tables.window
+        else:
+            qtable, qwindow = odd_multiples(Q.jac, DEFAULT_WINDOW), DEFAULT_WINDOW
+        w = inv(s, N)
+        z = hash_to_int(msghash)
+        X = Point(*jacobian_wnaf_multiply([(generator_table(), G_WINDOW, z * w % N), (qtable, qwindow, r * w % N)]))
+        if X.is_inf() or r != X.x: return False
+        return (not strict) or (X.y + self.v) % 2 == 1
+
+    def r_point(self):
+        '''
+        Returns the point R encoded by r and the header byte, or None if the signature is invalid
+        '''
+        v, r, s = self.v, self.r, self.s
+        if not (0 < r < N and 0 < s < N): return None
+        x = r
+        beta = pow(x*x*x+B,(P+1)//4,P)
+        y = beta if v%2 ^ beta%2 else (P - beta)
+        R = Point(x, y)
+        return R if R.on_curve() else None
+
+    def recover(self, msghash):
+        '''
+        Recovers the public key from the signature of a message hash
+        Returns a PublicKey (compressed according to the header byte) or None
+        '''
+        R = self.r_point()
+        if R is None: return None
+        # Q = r^-1 (sR - zG) (R being on the curve, Q always verifies the signature)
+        rinv = inv(self.r, N)
+        z = hash_to_int(msghash)
+        Q = Point(*jacobian_wnaf_multiply([(generator_table(), G_WINDOW, -z * rinv % N),
+                                           (odd_multiples(R.jac, DEFAULT_WINDOW), DEFAULT_WINDOW, self.s * rinv % N)]))
+        if Q.is_inf(): return None
+        return PublicKey(Q, self.compressed)
+
+
+class PubkeyRegistry(object):
+    '''
+    Bounded registry (LRU) of the public keys recovered for hash160s of addresses
+    Signatures of known addresses are checked directly against the stored key (no recovery, no hash160)
+    '''
+    def __init__(self, max_size=PUBKEY_REGISTRY_SIZE, tables=None):
+        '''
+        Parameters:
+            max_size = max number of public keys stored
+            tables   = PrecomputeCache used to check the signatures of known public keys (optional)
+        '''
+        import threading
+        from collections import OrderedDict
+        self.max_size = max_size
+        self.tables = tables
+        self._pubkeys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, h160):
+        with self._lock:
+            pub = self._pubkeys.pop(h160, None)
+            if pub is not None: self._pubkeys[h160] = pub
+            return pub
+
+    def put(self, h160, pub):
+        with self._lock:
+            self._pubkeys.pop(h160, None)
+            self._pubkeys[h160] = pub
+            while len(self._pubkeys) > self.max_size: self._pubkeys.popitem(last=False)
+
+    def __len__(self): return len(self._pubkeys)
+
+
+class PrecomputeCache(object):
+    '''
+    Bounded cache (LRU) of the odd multiples tables of public keys (wnaf multiplications of frequent signers)
+    Size of the cache is limited by the memory used by the tables
+    '''
+    def __init__(self, max_bytes=PRECOMPUTE_CACHE_SIZE, window=CACHED_WINDOW):
+        '''
+        Parameters:
+            max_bytes = max memory used by the tables (in bytes)
+            window    = window of the wnaf multiplications (table of 2^(window-2) points per public key)
+        '''
+        self.max_bytes = max_bytes
+        self.window = window
+        self.memory = 0
+        import threading
+        from collections import OrderedDict
+        self.hits = self.misses = self.evictions = 0
+        self._tables = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, point):
+        '''
+        Returns the odd multiples table of a point (computed and stored on a miss)
+        '''
+        key = point.xy
+        with self._lock:
+            entry = self._tables.pop(key, None)
+            if entry is not None:
+                self.hits += 1
+                self._tables[key] = entry
+                return entry[0]
+            self.misses += 1
+        table = odd_multiples(point.jac, self.window)
+        size = table_size(table)
+        with self._lock:
+            if key not in self._tables:
+                self._tables[key] = (table, size)
+                self.memory += size
+            while self.memory > self.max_bytes and self._tables:
+                self.memory -= self._tables.popitem(last=False)[1][1]
+                self.evictions += 1
+        return table
+
+    def stats(self):
+        with self._lock:
+            return {"tables": len(self._tables), "memory": self.memory, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def __len__(self): return len(self._tables)
+
+
+def table_size(table):
+    # Memory used by a table of points (in bytes)
+    return sys.getsizeof(table) + sum(sys.getsizeof(p) + sum(sys.getsizeof(c) for c in p) for p in table)
+
 
 ### EDCSA
 
 def decode_sig(sig):
-    bytez = base64.b64decode(sig)
-    return b2i(bytez[0]), decode(bytez[1:33],256), decode(bytez[33:],256)
+    return Signature.from_base64(sig).to_tuple()
 
-def ecdsa_raw_verify(msghash,vrs,pub):
-    v,r,s = vrs
-    w = inv(s,N)
-    z = hash_to_int(msghash)
-    u1, u2 = z*w % N, r*w % N
-    x,y = base10_add(base10_multiply(G,u1), base10_multiply(decode_pubkey(pub), u2))
-    return r == x
+def ecdsa_raw_verify(msghash,vrs,pub,tables=None):
+    return Signature(*vrs).verify(msghash, pub, tables=tables)
 
 def ecdsa_verify(msg,sig,pub):
     return ecdsa_raw_verify(electrum_sig_hash(msg), decode_sig(sig), pub)
 
 def ecdsa_raw_recover(msghash,vrs):
-    v,r,s = vrs
-    x = r
-    beta = pow(x*x*x+B,(P+1)//4,P)
-    y = beta if v%2 ^ beta%2 else (P - beta)
-    z = hash_to_int(msghash)
-    Qr = base10_add(neg_pubkey(base10_multiply(G,z)),base10_multiply((x,y),s))
-    Q = base10_multiply(Qr,inv(r,N))
-    if ecdsa_raw_verify(msghash,vrs,Q): return Q
-    return False
+    Q = Signature(*vrs).recover(msghash)
+    return Q.to_tuple() if Q else False
 
 def ecdsa_recover(msg,sig):
     Q = ecdsa_raw_recover(electrum_sig_hash(msg), decode_sig(sig))
@@ -237,35 +658,126 @@ def ecdsa_is_compressed(vrs):
     return False if v < 31 or v >= 35 else True
         
 
+# Low level verifications (pre-decoded binary inputs)
+
+class VerifyResult(tuple):
+    '''
+    Result of a low level verification (valid, pubkey, compressed)
+    '''
+    __slots__ = ()
+
+    def __new__(cls, valid, pubkey, compressed):
+        return tuple.__new__(cls, (valid, pubkey, compressed))
+
+    valid = property(lambda self: self[0])
+    pubkey = property(lambda self: self[1])
+    compressed = property(lambda self: self[2])
+
+def decode_bin_sig(sig):
+    return Signature.from_bin(sig).to_tuple()
+
+def bin_signature_verify(msg, sig, h160, vbyte=0, registry=None):
+    '''
+    Checks a signature without any text conversion
+    Returns a VerifyResult (valid, recovered pubkey in bin format, compressed flag)
+    Parameters:
+        msg      = signed message (bytes)
+        sig      = 65 bytes signature (header byte, r, s)
+        h160     = 20 bytes hash160 of the expected public key
+        vbyte    = version byte of the expected address (0 for mainnet, 111 for testnet)
+        registry = PubkeyRegistry of known public keys (optional)
+    '''
+    if len(sig) != 65 or len(h160) != 20: return VerifyResult(False, None, False)
+    sig = Signature.from_bin(sig)
+    # Header byte = 27 + recovery id (+ 4 for a compressed key). Other values are rejected
+    if sig.v < 27 or sig.v >= 35 or vbyte not in (0, 111): return VerifyResult(False, None, False)
+    msghash = electrum_sig_hash(msg)
+    if registry is not None:
+        # Fast path for known addresses: direct verification against the stored public key
+        pub = registry.get(h160)
+        if pub is not None and pub.compressed == sig.compressed:
+            return VerifyResult(sig.verify(msghash, pub, True, registry.tables), pub.serialize(), pub.compressed)
+    pub = sig.recover(msghash)
+    if pub is None: return VerifyResult(False, None, sig.compressed)
+    is_valid = pub.hash160() == h160
+    if is_valid and registry is not None: registry.put(h160, pub)
+    return VerifyResult(is_valid, pub.serialize(), pub.compressed)
+
+def bin_signature_verify_many(items):
+    '''
+    Checks a batch of signatures (see bin_signature_verify)
+    Modular inversions (r^-1, normalization of the points) are shared by the batch
+    Returns a list of VerifyResult (same order as items)
+    Parameters:
+        items = iterable of tuples (msg, sig, h160, vbyte)
+    '''
+    items = list(items)
+    results = [VerifyResult(False, None, False)] * len(items)
+    pending = []
+    for i, (msg, sig, h160, vbyte) in enumerate(items):
+        if len(sig) != 65 or len(h160) != 20: continue
+        sig = Signature.from_bin(sig)
+        if sig.v < 27 or sig.v >= 35 or vbyte not in (0, 111): continue
+        R = sig.r_point()
+        if R is None:
+            results[i] = VerifyResult(False, None, sig.compressed)
+            continue
+        pending.append((i, sig, R))
+    if not pending: return results
+
+    msghashes = electrum_sig_hashes([items[i][0] for i, sig, R in pending])
+    rinvs = batch_inv([sig.r for i, sig, R in pending], N)
+    size = 1 << (DEFAULT_WINDOW - 2)
+    tables = batch_normalize([p for i, sig, R in pending for p in odd_multiples(R.jac, DEFAULT_WINDOW, False)])
+    gtable = generator_table()
+    points = []
+    for k, (i, sig, R) in enumerate(pending):
+        z = hash_to_int(msghashes[k])
+        points.append(jacobian_wnaf_multiply([(gtable, G_WINDOW, -z * rinvs[k] % N),
+                                              (tables[k * size:(k + 1) * size], DEFAULT_WINDOW, sig.s * rinvs[k] % N)]))
+
+    finite = [k for k in range(len(pending)) if points[k][2]]
+    pubs = [PublicKey(Point(*Q), pending[k][1].compressed) for k, Q in zip(finite, batch_normalize([points[k] for k in finite]))]
+    for k, pub, h in zip(finite, pubs, hash160_many([pub.serialize() for pub in pubs])):
+        i = pending[k][0]
+        pub._hash160 = h
+        results[i] = VerifyResult(h == items[i][2], pub.serialize(), pub.compressed)
+    for k in set(range(len(pending))) - set(finite):
+        results[pending[k][0]] = VerifyResult(False, None, pending[k][1].compressed)
+    return results
+
+
 # High level verifications
 
-def signature_verify(msg, sig, addr, istest=False):
+def signature_verify(msg, sig, addr, istest=False, registry=None):
     try:
-        msg = to_bytes(msg)
-        sig = to_bytes(sig)
-        addr = to_bytes(addr)
-        # Recovers public key (and checks signature is valid)
-        Q = ecdsa_recover(msg,sig)
-        if not Q: return False
-        if ecdsa_is_compressed(decode_sig(sig)): Q = encode_pubkey(Q, 'hex_compressed')
-        # Checks given address is equal to address associated to public key
-        return True if pubkey_to_address(Q, pubbyte_prefix(istest)) == addr else False
+        # Decodes address (checks checksum and network)
+        vbyte, h160 = b58check_to_bin(to_bytes(addr))
+        if vbyte != pubbyte_prefix(istest): return False
+        # Recovers public key and checks it matches the address
+        return bin_signature_verify(to_bytes(msg), binascii.a2b_base64(to_bytes(sig)), h160, vbyte, registry).valid
     except AssertionError:
         return False
     
 def address_verify(addr, istest=False):
     try:
-        addr = to_bytes(addr)
-        # Checks checksum
-        leadingzbytes = len(re.match(b'^1*',addr).group(0))
-        data = b'\x00' * leadingzbytes + changebase(addr,58,256)
-        csum_ok = bin_dbl_sha256(data[:-4])[:4] == data[-4:]
+        # Checks checksum (decodes address once)
+        vb, h160 = b58check_to_bin(to_bytes(addr))
         # Checks network
-        vb = get_version_byte(addr)
-        ntw_ok = (vb == 0 and not istest) or (vb == 111 and istest)
-        # Result
-        return csum_ok and ntw_ok
+        return vb == pubbyte_prefix(istest)
     except AssertionError:
         return False
 
 
+# Initialization
+
+def warmup():
+    '''
+    Initializes up front the state otherwise built on first use (hash state, code strings, EC tables)
+    '''
+    msg_prefix_sha256()
+    get_code_string(256)
+    generator_table()
+    bin_hash160(b'')
+
+
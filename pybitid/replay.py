@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+'''
+Version: 0.0.4
+Offline replay of bitid callback logs (audit)
+Usage:
+    python -m pybitid.replay --callback URI [--testnet] [--jobs N] [--chunk-size N] [--checkpoint FILE] logfile
+Each line of the log is a json record with the fields address, signature and uri.
+Records are checked with bitid.challenge_valid() against the callback uri of the website
+(never against the callback embedded in the record, which would accept challenges signed for another site).
+Progress is saved in a checkpoint file so an interrupted run resumes where it stopped.
+A checkpoint is only resumed by a run with the same callback uri, network and log file. A finished run starts over.
+A json report (throughput and counts per rejection reason) is written on stdout.
+'''
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from itertools import islice
+from pybitid import bitid
+from pybitid.validate import chunked, map_chunks
+
+CHUNK_SIZE          = 500
+
+# Results of a record check
+RESULT_VALID        = "valid"
+REASON_MALFORMED    = "malformed"
+REASON_ADDRESS      = "address"
+REASON_URI          = "uri"
+REASON_SIGNATURE    = "signature"
+RESULTS             = (RESULT_VALID, REASON_MALFORMED, REASON_ADDRESS, REASON_URI, REASON_SIGNATURE)
+
+
+def check_record(line, callback_uri, is_testnet=False):
+    '''
+    Checks a callback log record
+    Returns RESULT_VALID or the reason of the rejection
+    Parameters:
+        line         = json record (address, signature, uri)
+        callback_uri = callback uri used by the website
+        is_testnet   = True if validation done for test network, False for main network (optional, default = False)
+    '''
+    try:
+        record = json.loads(line)
+        fields = (record["address"], record["signature"], record["uri"])
+    except (ValueError, KeyError, TypeError):
+        return REASON_MALFORMED
+    if not all(isinstance(f, type(u"")) for f in fields): return REASON_MALFORMED
+    addr, sign, bitid_uri = fields
+    if not bitid.address_valid(addr, is_testnet): return REASON_ADDRESS
+    if not bitid.uri_valid(bitid_uri, callback_uri): return REASON_URI
+    if not bitid.signature_valid(addr, sign, bitid_uri, callback_uri, is_testnet): return REASON_SIGNATURE
+    return RESULT_VALID
+
+
+def check_chunk(args):
+    '''
+    Checks a list of records
+    Returns a list of results
+    Parameters:
+        args = tuple (list of records, callback_uri, is_testnet)
+    '''
+    lines, callback_uri, is_testnet = args
+    return [check_record(line, callback_uri, is_testnet) for line in lines]
+
+
+def load_checkpoint(path, params=None):
+    '''
+    Loads a checkpoint
+    Returns a tuple (number of records already processed, counts per result)
+    A checkpoint saved with other parameters or at the end of a run isn't resumed (0, zero counts)
+    Parameters:
+        path   = path of the checkpoint file (None => no checkpoint)
+        params = parameters of the run (dict) which must match the parameters saved in the checkpoint
+    '''
+    counts = dict((r, 0) for r in RESULTS)
+    if (path is None) or (not os.path.exists(path)): return 0, counts
+    with open(path) as f:
+        data = json.load(f)
+    if data.get("finished") or data.get("params") != params: return 0, counts
+    counts.update(data["counts"])
+    return data["offset"], counts
+
+
+def save_checkpoint(path, offset, counts, params=None, finished=False):
+    '''
+    Saves a checkpoint (atomically)
+    Parameters:
+        path     = path of the checkpoint file
+        offset   = number of records already processed
+        counts   = counts per result
+        params   = parameters of the run (dict)
+        finished = True if the whole log was processed
+    '''
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"offset": offset, "counts": counts, "params": params, "finished": finished}, f)
+    os.rename(tmp_path, path)
+
+
+def replay(lines, callback_uri, is_testnet=False, processes=1, chunk_size=CHUNK_SIZE, checkpoint=None, source=None):
+    '''
+    Replays a callback log
+    Returns a report (dict with processed records, elapsed time, throughput, counts per result)
+    Parameters:
+        lines        = iterable of json records
+        callback_uri = callback uri used by the website
+        is_testnet   = True if validation done for test network, False for main network (optional, default = False)
+        processes    = number of worker processes (optional, default = 1)
+        chunk_size   = number of records per chunk (optional)
+        checkpoint   = path of the checkpoint file (optional, default = None => no checkpoint)
+        source       = name of the log (optional, saved in the checkpoint to detect another log)
+    '''
+    params = {"callback_uri": callback_uri, "is_testnet": is_testnet, "source": source}
+    offset, counts = load_checkpoint(checkpoint, params)
+    lines = islice(lines, offset, None)
+    chunks = chunked(lines, chunk_size)
+    if processes <= 1:
+        results = ((chunk, check_chunk((chunk, callback_uri, is_testnet))) for chunk in chunks)
+    else:
+        results = map_chunks(check_chunk, chunks, processes, callback_uri, is_testnet)
+
+    processed = 0
+    start = time.time()
+    for chunk, chunk_results in results:
+        for r in chunk_results: counts[r] += 1
+        processed += len(chunk)
+        if checkpoint is not None: save_checkpoint(checkpoint, offset + processed, counts, params)
+    elapsed = time.time() - start
+    if checkpoint is not None: save_checkpoint(checkpoint, offset + processed, counts, params, True)
+
+    return {
+        "resumed_at": offset,
+        "processed": processed,
+        "total": offset + processed,
+        "elapsed": elapsed,
+        "throughput": processed / elapsed if elapsed > 0 else 0.0,
+        "counts": counts,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m pybitid.replay', description='Replays and audits a bitid callback log')
+    parser.add_argument('file', help='json lines log file (address, signature, uri)')
+    parser.add_argument('--callback', required=True, help='callback uri used by the website')
+    parser.add_argument('-t', '--testnet', action='store_true', help='validates records for the testnet')
+    parser.add_argument('-j', '--jobs', type=int, default=multiprocessing.cpu_count(), help='number of worker processes')
+    parser.add_argument('-c', '--chunk-size', type=int, default=CHUNK_SIZE, help='number of records per task')
+    parser.add_argument('--checkpoint', default=None, help='checkpoint file (default = <file>.checkpoint)')
+    parser.add_argument('--no-checkpoint', action='store_true', help='disables checkpoints')
+    args = parser.parse_args(argv)
+
+    checkpoint = None if args.no_checkpoint else (args.checkpoint or args.file + ".checkpoint")
+    with open(args.file) as f:
+        report = replay(f, args.callback, args.testnet, args.jobs, args.chunk_size, checkpoint, os.path.abspath(args.file))
+    sys.stdout.write(json.dumps(report, sort_keys=True) + "\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+#!/usr/bin/python
+'''
+Version: 0.0.4
+Pure python implementation of RIPEMD-160
+Used when hashlib doesn't provide ripemd160 (e.g. OpenSSL 3 without the legacy provider)
+Message words, shifts and constants are table-driven. Rounds are not unrolled: each of the 5 rounds of a line is a loop
+over its 16 steps, with the boolean function of the round inlined in the loop body.
+'''
+import struct
+
+DIGEST_SIZE     = 20
+BLOCK_SIZE      = 64
+MASK            = 0xffffffff
+
+# Message words (left and right lines)
+RL = (0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15,
+      7, 4, 13, 1, 10, 6, 15, 3, 12, 0, 9, 5, 2, 14, 11, 8,
+      3, 10, 14, 4, 9, 15, 8, 1, 2, 7, 0, 6, 13, 11, 5, 12,
+      1, 9, 11, 10, 0, 8, 12, 4, 13, 3, 7, 15, 14, 5, 6, 2,
+      4, 0, 5, 9, 7, 12, 2, 10, 14, 1, 3, 8, 11, 6, 15, 13)
+RR = (5, 14, 7, 0, 9, 2, 11, 4, 13, 6, 15, 8, 1, 10, 3, 12,
+      6, 11, 3, 7, 0, 13, 5, 10, 14, 15, 8, 12, 4, 9, 1, 2,
+      15, 5, 1, 3, 7, 14, 6, 9, 11, 8, 12, 2, 10, 0, 4, 13,
+      8, 6, 4, 1, 3, 11, 15, 0, 5, 12, 2, 13, 9, 7, 10, 14,
+      12, 15, 10, 4, 1, 5, 8, 7, 6, 2, 13, 14, 0, 3, 9, 11)
+
+# Rotations (left and right lines)
+SL = (11, 14, 15, 12, 5, 8, 7, 9, 11, 13, 14, 15, 6, 7, 9, 8,
+      7, 6, 8, 13, 11, 9, 7, 15, 7, 12, 15, 9, 11, 7, 13, 12,
+      11, 13, 6, 7, 14, 9, 13, 15, 14, 8, 13, 6, 5, 12, 7, 5,
+      11, 12, 14, 15, 14, 15, 9, 8, 9, 14, 5, 6, 8, 6, 5, 12,
+      9, 15, 5, 11, 6, 8, 13, 12, 5, 12, 13, 14, 11, 8, 5, 6)
+SR = (8, 9, 9, 11, 13, 15, 15, 5, 7, 7, 8, 11, 14, 14, 12, 6,
+      9, 13, 15, 7, 12, 8, 9, 11, 7, 7, 12, 7, 6, 15, 13, 11,
+      9, 7, 15, 11, 8, 6, 6, 14, 12, 13, 5, 14, 13, 13, 7, 5,
+      15, 5, 8, 11, 14, 14, 6, 14, 6, 9, 12, 9, 12, 5, 15, 8,
+      8, 5, 12, 9, 12, 5, 14, 6, 8, 13, 6, 5, 15, 13, 11, 11)
+
+# Constants per round (left and right lines)
+KL = (0x00000000, 0x5a827999, 0x6ed9eba1, 0x8f1bbcdc, 0xa953fd4e)
+KR = (0x50a28be6, 0x5c4dd124, 0x6d703ef3, 0x7a6d76e9, 0x00000000)
+
+# (word, rotation) pairs of each round
+ROUNDS_L = tuple(tuple(zip(RL[16*i:16*i+16], SL[16*i:16*i+16])) for i in range(5))
+ROUNDS_R = tuple(tuple(zip(RR[16*i:16*i+16], SR[16*i:16*i+16])) for i in range(5))
+
+INITIAL_STATE = (0x67452301, 0xefcdab89, 0x98badcfe, 0x10325476, 0xc3d2e1f0)
+
+
+def compress(state, block):
+    '''
+    Processes a 64 bytes block
+    Returns the new state
+    '''
+    X = struct.unpack('<16L', block)
+    h0, h1, h2, h3, h4 = state
+
+    # Left line (f = x^y^z, (x&y)|(~x&z), (x|~y)^z, (x&z)|(y&~z), x^(y|~z))
+    a, b, c, d, e = state
+    k = KL[0]
+    for r, s in ROUNDS_L[0]:
+        t = (a + (b ^ c ^ d) + X[r] + k) & MASK
+        t = (((t << s) | (t >> (32 - s))) + e) & MASK
+        a, e, d, c, b = e, d, ((c << 10) | (c >> 22)) & MASK, b, t
+    k = KL[1]
+    for r, s in ROUNDS_L[1]:
+        t = (a + ((b & c) | (~b & d)) + X[r] + k) & MASK
+        t = (((t << s) | (t >> (32 - s))) + e) & MASK
+        a, e, d, c, b = e, d, ((c << 10) | (c >> 22)) & MASK, b, t
+    k = KL[2]
+    for r, s in ROUNDS_L[2]:
+        t = (a + ((b | (~c & MASK)) ^ d) + X[r] + k) & MASK
+        t = (((t << s) | (t >> (32 - s))) + e) & MASK
+        a, e, d, c, b = e, d, ((c << 10) | (c >> 22)) & MASK, b, t
+    k = KL[3]
+    for r, s in ROUNDS_L[3]:
+        t = (a + ((b & d) | (c & ~d)) + X[r] + k) & MASK
+        t = (((t << s) | (t >> (32 - s))) + e) & MASK
+        a, e, d, c, b = e, d, ((c << 10) | (c >> 22)) & MASK, b, t
+    k = KL[4]
+    for r, s in ROUNDS_L[4]:
+        t = (a + (b ^ (c | (~d & MASK))) + X[r] + k) & MASK
+        t = (((t << s) | (t >> (32 - s))) + e) & MASK
+        a, e, d, c, b = e, d, ((c << 10) | (c >> 22)) & MASK, b, t
+    al, bl, cl, dl, el = a, b, c, d, e
+
+    # Right line (boolean functions in reverse order)
+    a, b, c, d, e = state
+    k = KR[0]
+    for r, s in ROUNDS_R[0]:
+        t = (a + (b ^ (c | (~d & MASK))) + X[r] + k) & MASK
+        t = (((t << s) | (t >> (32 - s))) + e) & MASK
+        a, e, d, c, b = e, d, ((c << 10) | (c >> 22)) & MASK, b, t
+    k = KR[1]
+    for r, s in ROUNDS_R[1]:
+        t = (a + ((b & d) | (c & ~d)) + X[r] + k) & MASK
+        t = (((t << s) | (t >> (32 - s))) + e) & MASK
+        a, e, d, c, b = e, d, ((c << 10) | (c >> 22)) & MASK, b, t
+    k = KR[2]
+    for r, s in ROUNDS_R[2]:
+        t = (a + ((b | (~c & MASK)) ^ d) + X[r] + k) & MASK
+        t = (((t << s) | (t >> (32 - s))) + e) & MASK
+        a, e, d, c, b = e, d, ((c << 10) | (c >> 22)) & MASK, b, t
+    k = KR[3]
+    for r, s in ROUNDS_R[3]:
+        t = (a + ((b & c) | (~b & d)) + X[r] + k) & MASK
+        t = (((t << s) | (t >> (32 - s))) + e) & MASK
+        a, e, d, c, b = e, d, ((c << 10) | (c >> 22)) & MASK, b, t
+    k = KR[4]
+    for r, s in ROUNDS_R[4]:
+        t = (a + (b ^ c ^ d) + X[r] + k) & MASK
+        t = (((t << s) | (t >> (32 - s))) + e) & MASK
+        a, e, d, c, b = e, d, ((c << 10) | (c >> 22)) & MASK, b, t
+
+    return ((h1 + cl + d) & MASK, (h2 + dl + e) & MASK, (h3 + el + a) & MASK,
+            (h4 + al + b) & MASK, (h0 + bl + c) & MASK)
+
+
+class RIPEMD160(object):
+    '''
+    RIPEMD-160 hash object (same interface as hashlib objects)
+    '''
+    name = 'ripemd160'
+    digest_size = DIGEST_SIZE
+    block_size = BLOCK_SIZE
+
+    def __init__(self, data=b''):
+        self._state = INITIAL_STATE
+        self._buffer = b''
+        self._length = 0
+        if data: self.update(data)
+
+    def update(self, data):
+        self._length += len(data)
+        data = self._buffer + data
+        end = len(data) - len(data) % BLOCK_SIZE
+        state = self._state
+        for i in range(0, end, BLOCK_SIZE):
+            state = compress(state, data[i:i + BLOCK_SIZE])
+        self._state = state
+        self._buffer = data[end:]
+
+    def digest(self):
+        # Padding: 0x80, zeros, length in bits (little endian)
+        padlen = (55 - self._length) % BLOCK_SIZE
+        tail = self._buffer + b'\x80' + b'\x00' * padlen + struct.pack('<Q', (self._length * 8) & 0xffffffffffffffff)
+        state = self._state
+        for i in range(0, len(tail), BLOCK_SIZE):
+            state = compress(state, tail[i:i + BLOCK_SIZE])
+        return struct.pack('<5L', *state)
+
+    def hexdigest(self):
+        return ''.join('%02x' % c for c in bytearray(self.digest()))
+
+    def copy(self):
+        other = RIPEMD160()
+        other._state, other._buffer, other._length = self._state, self._buffer, self._length
+        return other
+
+
+def new(data=b''):
+    return RIPEMD160(data)
+
+
+def ripemd160(data):
+    '''
+    Returns the RIPEMD-160 digest of data
+    '''
+    return RIPEMD160(data).digest()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+'''
+Version: 0.0.4
+Signed session tokens issued after a successful bitid login
+A token is bound to an address and a callback uri, expires after a ttl and costs one HMAC to check
+(instead of a public key recovery per request).
+Token format: <key id>.<expiry>.<address>.<mac> (mac = truncated HMAC-SHA256, base64url encoded)
+Usage:
+    tokens = SessionTokens([("k1", secret)])
+    token = tokens.login(controller, addr, sign, bitid_uri, callback_uri)
+    ...
+    addr = tokens.verify(token, callback_uri)
+'''
+import hmac
+import time
+import base64
+import hashlib
+from pybitid.pysix import to_bytes
+
+TOKEN_TTL           = 3600
+MAC_LEN             = 16
+SEPARATOR           = "."
+
+
+class SessionTokens(object):
+    '''
+    Issues and checks session tokens
+    Tokens are signed with the current key (first key) and checked with any known key (key rotation)
+    '''
+    def __init__(self, keys, ttl=TOKEN_TTL, clock=time.time):
+        '''
+        Parameters:
+            keys  = list of tuples (key id, secret). The first key signs the new tokens
+            ttl   = lifetime of a token (in seconds)
+            clock = function returning the current time in seconds (optional)
+        '''
+        self.ttl = ttl
+        self.clock = clock
+        self._keys = []
+        for kid, secret in reversed(list(keys)): self.rotate(kid, secret)
+        if not self._keys: raise ValueError("Missing parameter: keys")
+
+    @property
+    def current_kid(self): return self._keys[0][0]
+
+    def rotate(self, kid, secret):
+        '''
+        Adds a key used to sign the new tokens. Previous keys are kept to check the tokens already issued
+        Parameters:
+            kid    = key id (alphanumeric string)
+            secret = secret (bytes)
+        '''
+        if not kid or not kid.isalnum(): raise ValueError("Invalid parameter: kid")
+        self._keys = [(kid, to_bytes(secret) if not isinstance(secret, bytes) else secret)] + [k for k in self._keys if k[0] != kid]
+
+    def retire(self, kid):
+        '''
+        Removes a key (tokens signed with this key become invalid). The current key can't be removed
+        '''
+        if kid == self.current_kid: raise ValueError("Invalid parameter: kid (current key)")
+        self._keys = [k for k in self._keys if k[0] != kid]
+
+    def issue(self, addr, callback_uri, ttl=None):
+        '''
+        Issues a token for an address
+        Returns the token
+        Parameters:
+            addr         = bitcoin address
+            callback_uri = callback uri used by the website
+            ttl          = lifetime of the token (optional, default = ttl of the instance)
+        '''
+        kid, secret = self._keys[0]
+        expiry = int(self.clock()) + (self.ttl if ttl is None else ttl)
+        payload = SEPARATOR.join((kid, str(expiry), addr))
+        return payload + SEPARATOR + self._mac(secret, payload, callback_uri)
+
+    def login(self, controller, addr, sign, bitid_uri, callback_uri, client_key=None, is_testnet=False):
+        '''
+        Checks a challenge through an admission controller and issues a token if it's valid
+        The nonce must have been issued by the controller and is consumed, so a signature can't be used twice.
+        Integrators checking the nonces by themselves must call issue() after their own checks.
+        Returns the token or None if the challenge is rejected or invalid
+        Parameters:
+            controller   = AdmissionController which has issued the nonce
+            addr         = bitcoin address
+            sign         = signature
+            bitid_uri    = bitid uri
+            callback_uri = callback uri used by the website
+            client_key   = key identifying the client (ip address, ...) or None to disable rate limiting
+            is_testnet   = True if validation done for test network, False for main network (optional, default = False)
+        '''
+        if not controller.challenge_valid(addr, sign, bitid_uri, callback_uri, client_key, is_testnet): return None
+        return self.issue(addr, callback_uri)
+
+    def verify(self, token, callback_uri):
+        '''
+        Checks a token
+        Returns the address or None if the token is invalid or expired
+        Parameters:
+            token        = token
+            callback_uri = callback uri used by the website
+        '''
+        try:
+            kid, expiry, addr, mac = token.split(SEPARATOR)
+            expiry = int(expiry)
+        except (ValueError, AttributeError):
+            return None
+        if expiry < self.clock(): return None
+        for key_id, secret in self._keys:
+            if key_id == kid:
+                expected = self._mac(secret, SEPARATOR.join((kid, str(expiry), addr)), callback_uri)
+                return addr if hmac.compare_digest(to_bytes(expected), to_bytes(mac)) else None
+        return None
+
+    def _mac(self, secret, payload, callback_uri):
+        digest = hmac.new(secret, to_bytes(payload + "|" + callback_uri), hashlib.sha256).digest()[:MAC_LEN]
+        return base64.urlsafe_b64encode(digest).decode().rstrip("=")
@@ -0,0 +1,26 @@
+'''
+Version: 0.0.4
+Test data and helpers shared by the unit tests and benchmarks
+'''
+
+# Challenge signed for the main network
+CALLBACK_URI      = "https://localhost:3000/callback"
+NONCE             = "fe32e61882a71074"
+BITID_URI         = "bitid://localhost:3000/callback?x=fe32e61882a71074"
+ADDRESS           = "1HpE8571PFRwge5coHiFdSCLcwa7qetcn"
+SIGNATURE         = "IPKm1/EZ1AKscpwSZI34F5NiEkpdr7QKHeLOPPSGs6TXJHULs7CSNtjurcfg72HNuKvL2YgNXdOetQRyARhX7bg="
+BAD_SIGNATURE     = "H4/hhdnxtXHduvCaA+Vnf0TM4UqdljTsbdIfltwx9+w50gg3mxy8WgLSLIiEjTnxbOPW9sNRzEfjibZXnWEpde4="
+
+# Challenge signed for the test network (unsecure callback)
+CALLBACK_URI_TEST = "http://bitid.bitcoin.blue/callback"
+BITID_URI_TEST    = "bitid://bitid.bitcoin.blue/callback?x=3893a2a881dd4a1e&u=1"
+ADDRESS_TEST      = "mpsaRD2ugdCY1iFrQdsDYRT4qeZzCnvGHW"
+SIGNATURE_TEST    = "ID5heI0WOeWoryGhZHaxoOH5vkmmcwDsfc4nDQ5vPcXSWh2jyETDGkSNO5zk4nbESGD6k0tgFxYA3HzlEGOf5Uc="
+
+
+class FakeClock(object):
+    '''
+    Clock returning a time set by the test (pass it as clock parameter)
+    '''
+    def __init__(self, now=1000.0): self.now = now
+    def __call__(self): return self.now
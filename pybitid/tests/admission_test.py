@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+'''
+Version: 0.0.4
+UnitTest of the admission controller
+'''
+import time
+import threading
+import unittest
+import pybitid.admission as admission
+from pybitid.tests import CALLBACK_URI, NONCE, ADDRESS, SIGNATURE, BAD_SIGNATURE, FakeClock
+
+
+class AdmissionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def controller(self, **kwargs):
+        return admission.AdmissionController(clock=self.clock, **kwargs)
+
+    def test_token_bucket(self):
+        bucket = admission.TokenBucket(1.0, 2, 0.0)
+        self.assertTrue(bucket.consume(0.0))
+        self.assertTrue(bucket.consume(0.0))
+        self.assertFalse(bucket.consume(0.0))
+        self.assertTrue(bucket.consume(1.0))
+
+    def test_valid_challenge(self):
+        ctrl = self.controller()
+        bitid_uri = ctrl.issue(CALLBACK_URI, NONCE)
+        self.assertEqual(admission.ACCEPTED, ctrl.check(ADDRESS, SIGNATURE, bitid_uri, CALLBACK_URI))
+        # Nonce is consumed
+        self.assertEqual(admission.REJECT_UNKNOWN, ctrl.check(ADDRESS, SIGNATURE, bitid_uri, CALLBACK_URI))
+        stats = ctrl.stats()
+        self.assertEqual(1, stats[admission.ACCEPTED])
+        self.assertEqual(1, stats[admission.REJECT_UNKNOWN])
+        self.assertEqual(0, stats["in_flight"])
+
+    def test_invalid_signature_keeps_nonce(self):
+        ctrl = self.controller()
+        bitid_uri = ctrl.issue(CALLBACK_URI, NONCE)
+        self.assertFalse(ctrl.challenge_valid(ADDRESS, BAD_SIGNATURE, bitid_uri, CALLBACK_URI))
+        self.assertTrue(ctrl.challenge_valid(ADDRESS, SIGNATURE, bitid_uri, CALLBACK_URI))
+        self.assertEqual(1, ctrl.stats()[admission.REJECT_INVALID])
+
+    def test_unknown_and_expired_nonces(self):
+        ctrl = self.controller(nonce_ttl=10)
+        self.assertEqual(admission.REJECT_UNKNOWN, ctrl.admit("bitid://localhost:3000/callback?x=unknown")[0])
+        bitid_uri = ctrl.issue(CALLBACK_URI, NONCE)
+        self.clock.now += 11
+        self.assertEqual(admission.REJECT_EXPIRED, ctrl.admit(bitid_uri)[0])
+        self.assertEqual(admission.REJECT_UNKNOWN, ctrl.admit(bitid_uri)[0])
+
+    def test_max_nonces(self):
+        ctrl = self.controller(max_nonces=2)
+        for i in range(3): ctrl.register_nonce("nonce%d" % i)
+        self.assertEqual(2, ctrl.stats()["nonces"])
+        self.assertEqual(admission.REJECT_UNKNOWN, ctrl.admit("bitid://localhost:3000/callback?x=nonce0")[0])
+
+    def test_rate_limit(self):
+        ctrl = self.controller(client_rate=1.0, client_burst=2)
+        bitid_uri = ctrl.issue(CALLBACK_URI, NONCE)
+        for i in range(2):
+            result, nonce = ctrl.admit(bitid_uri, "10.0.0.1")
+            self.assertEqual(admission.ACCEPTED, result)
+            ctrl.release(nonce, False)
+        self.assertEqual(admission.REJECT_RATE_LIMITED, ctrl.admit(bitid_uri, "10.0.0.1")[0])
+        result, nonce = ctrl.admit(bitid_uri, "10.0.0.2")
+        self.assertEqual(admission.ACCEPTED, result)
+        ctrl.release(nonce, False)
+        self.clock.now += 1
+        self.assertEqual(admission.ACCEPTED, ctrl.admit(bitid_uri, "10.0.0.1")[0])
+
+    def test_overload_gives_priority_to_recent_challenges(self):
+        ctrl = self.controller(max_in_flight=2, reserved_slots=1, priority_window=30)
+        old_uris = [ctrl.issue(CALLBACK_URI, "oldnonce%d" % i) for i in range(2)]
+        self.clock.now += 60
+        recent_uris = [ctrl.issue(CALLBACK_URI, "recentnonce%d" % i) for i in range(3)]
+        self.assertEqual(admission.ACCEPTED, ctrl.admit(old_uris[0])[0])
+        # Last slot is reserved for recent challenges
+        self.assertEqual(admission.REJECT_OVERLOADED, ctrl.admit(old_uris[1])[0])
+        self.assertEqual(admission.ACCEPTED, ctrl.admit(recent_uris[0])[0])
+        self.assertEqual(admission.REJECT_OVERLOADED, ctrl.admit(recent_uris[1])[0])
+        ctrl.release("oldnonce0", False)
+        self.assertEqual(admission.ACCEPTED, ctrl.admit(recent_uris[2])[0])
+        stats = ctrl.stats()
+        self.assertEqual(2, stats[admission.REJECT_OVERLOADED])
+        self.assertEqual(2, stats["in_flight"])
+
+    def test_nonce_in_flight_is_not_admitted_twice(self):
+        ctrl = self.controller()
+        bitid_uri = ctrl.issue(CALLBACK_URI, NONCE)
+        result, nonce = ctrl.admit(bitid_uri)
+        self.assertEqual(admission.ACCEPTED, result)
+        self.assertEqual(admission.REJECT_IN_FLIGHT, ctrl.admit(bitid_uri)[0])
+        # Invalid signature: the nonce can be used again
+        ctrl.release(nonce, False)
+        self.assertEqual(admission.ACCEPTED, ctrl.admit(bitid_uri)[0])
+
+    def test_concurrent_replays(self):
+        # Slow verifications (as under load): only one of the concurrent callbacks replaying a valid challenge is accepted
+        challenge_valid = admission.bitid.challenge_valid
+        def slow_challenge_valid(*args):
+            time.sleep(0.05)
+            return challenge_valid(*args)
+        ctrl = self.controller()
+        bitid_uri = ctrl.issue(CALLBACK_URI, NONCE)
+        results = []
+        def check(): results.append(ctrl.check(ADDRESS, SIGNATURE, bitid_uri, CALLBACK_URI))
+        admission.bitid.challenge_valid = slow_challenge_valid
+        try:
+            threads = [threading.Thread(target=check) for i in range(4)]
+            for t in threads: t.start()
+            for t in threads: t.join()
+        finally:
+            admission.bitid.challenge_valid = challenge_valid
+        self.assertEqual(1, results.count(admission.ACCEPTED))
+        self.assertEqual(3, results.count(admission.REJECT_IN_FLIGHT) + results.count(admission.REJECT_UNKNOWN))
+        self.assertEqual(0, ctrl.stats()["in_flight"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+'''
+Version: 0.0.4
+UnitTest of the WSGI / ASGI callback apps (including a load test against a local in-process server)
+'''
+import io
+import json
+import threading
+import unittest
+from wsgiref.simple_server import make_server, WSGIServer, WSGIRequestHandler
+from pybitid.admission import AdmissionController
+from pybitid.callback import BoundedVerifier, VerifierOverloaded
+from pybitid.wsgi import BitIdWSGIApp, BitIdWSGIMiddleware
+from pybitid.tests import CALLBACK_URI, BITID_URI, NONCE, ADDRESS, SIGNATURE, BAD_SIGNATURE, FakeClock
+
+try:
+    from urllib import urlencode
+    from urllib2 import Request, urlopen, HTTPError
+    from SocketServer import ThreadingMixIn
+except ImportError:
+    from urllib.parse import urlencode
+    from urllib.request import Request, urlopen
+    from urllib.error import HTTPError
+    from socketserver import ThreadingMixIn
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None
+
+try:
+    import asyncio
+    from pybitid.asgi import BitIdASGIApp, BitIdASGIMiddleware
+except (ImportError, SyntaxError):
+    asyncio = None
+
+
+LOAD_CLIENTS      = 8
+LOAD_REQUESTS     = 5
+
+def json_body(addr=ADDRESS, sign=SIGNATURE, uri=BITID_URI):
+    return json.dumps({"address": addr, "signature": sign, "uri": uri}).encode()
+
+def call_wsgi(app, body, method="POST", content_type="application/json", path="/callback"):
+    environ = {
+        "REQUEST_METHOD": method, "PATH_INFO": path, "CONTENT_TYPE": content_type,
+        "CONTENT_LENGTH": str(len(body)), "wsgi.input": io.BytesIO(body), "REMOTE_ADDR": "127.0.0.1",
+    }
+    res = {}
+    def start_response(status, headers): res["status"], res["headers"] = int(status.split()[0]), dict(headers)
+    res["body"] = b"".join(app(environ, start_response))
+    return res
+
+def done(value=None):
+    # Awaitable returning value (no async syntax, this module must compile on Python 2.7)
+    future = asyncio.get_event_loop().create_future()
+    future.set_result(value)
+    return future
+
+def call_asgi(app, body, method="POST", path="/callback"):
+    scope = {"type": "http", "method": method, "path": path, "headers": [(b"content-type", b"application/json")],
+             "client": ("127.0.0.1", 1234)}
+    messages = [{"type": "http.request", "body": body[:10], "more_body": True},
+                {"type": "http.request", "body": body[10:], "more_body": False}]
+    sent = []
+    def receive(): return done(messages.pop(0))
+    def send(message):
+        sent.append(message)
+        return done()
+    loop = asyncio.new_event_loop()
+    try:
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(app(scope, receive, send))
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+    return sent[0]["status"], sent[1]["body"]
+
+def nonce_controller():
+    # Admission controller which has issued the test challenge
+    controller = AdmissionController(clock=FakeClock())
+    controller.register_nonce(NONCE)
+    return controller
+
+def blocked_verifier():
+    # Verifier whose single slot is held until the returned event is set
+    verifier = BoundedVerifier(max_workers=1, max_pending=1)
+    release = threading.Event()
+    verifier.submit(release.wait)
+    return verifier, release
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args): pass
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+@unittest.skipIf(ThreadPoolExecutor is None, "requires concurrent.futures (Python 3.2+ or the futures backport)")
+class CallbackTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.logins = []
+
+    def on_login(self, addr, nonce):
+        self.logins.append((addr, nonce))
+
+    def test_bounded_verifier(self):
+        verifier, release = blocked_verifier()
+        self.assertRaises(VerifierOverloaded, verifier.submit, len, "x")
+        self.assertEqual(1, verifier.rejected)
+        release.set()
+        verifier.shutdown()
+
+    def test_wsgi_valid_callback(self):
+        app = BitIdWSGIApp(CALLBACK_URI, self.on_login)
+        res = call_wsgi(app, json_body())
+        self.assertEqual(200, res["status"])
+        self.assertEqual([(ADDRESS, NONCE)], self.logins)
+        form = urlencode({"address": ADDRESS, "signature": SIGNATURE, "uri": BITID_URI}).encode()
+        res = call_wsgi(app, form, content_type="application/x-www-form-urlencoded")
+        self.assertEqual(200, res["status"])
+
+    def test_wsgi_rejected_callbacks(self):
+        app = BitIdWSGIApp(CALLBACK_URI, self.on_login)
+        self.assertEqual(400, call_wsgi(app, b"{garbage")["status"])
+        self.assertEqual(401, call_wsgi(app, json_body(addr="garbage"))["status"])
+        self.assertEqual(401, call_wsgi(app, json_body(uri=BITID_URI + "&u=1"))["status"])
+        self.assertEqual(401, call_wsgi(app, json_body(sign=BAD_SIGNATURE))["status"])
+        self.assertEqual(405, call_wsgi(app, b"", method="GET")["status"])
+        self.assertEqual(413, call_wsgi(app, b"x" * 5000)["status"])
+        self.assertEqual([], self.logins)
+
+    def test_wsgi_overloaded(self):
+        verifier, release = blocked_verifier()
+        app = BitIdWSGIApp(CALLBACK_URI, self.on_login, verifier=verifier)
+        res = call_wsgi(app, json_body())
+        self.assertEqual(503, res["status"])
+        self.assertIn("Retry-After", res["headers"])
+        self.assertEqual([], self.logins)
+        release.set()
+        verifier.shutdown()
+
+    def test_wsgi_middleware(self):
+        def inner(environ, start_response):
+            start_response("200 OK", [])
+            return [b"inner"]
+        app = BitIdWSGIMiddleware(inner, CALLBACK_URI, self.on_login)
+        self.assertEqual(b"inner", call_wsgi(app, b"", method="GET")["body"])
+        self.assertEqual(b"inner", call_wsgi(app, json_body(), path="/other")["body"])
+        self.assertEqual(200, call_wsgi(app, json_body())["status"])
+        self.assertEqual(1, len(self.logins))
+
+    def test_wsgi_nonce_checked(self):
+        app = BitIdWSGIApp(CALLBACK_URI, self.on_login, controller=nonce_controller())
+        self.assertEqual(401, call_wsgi(app, json_body(sign=BAD_SIGNATURE))["status"])
+        self.assertEqual(200, call_wsgi(app, json_body())["status"])
+        # Replayed callback
+        res = call_wsgi(app, json_body())
+        self.assertEqual(401, res["status"])
+        self.assertEqual("Invalid nonce", json.loads(res["body"].decode())["message"])
+        self.assertEqual([(ADDRESS, NONCE)], self.logins)
+        # Nonce never issued by the server
+        app = BitIdWSGIApp(CALLBACK_URI, self.on_login, controller=AdmissionController(clock=FakeClock()))
+        self.assertEqual(401, call_wsgi(app, json_body())["status"])
+        self.assertEqual(1, len(self.logins))
+
+    def test_wsgi_nonce_released_when_overloaded(self):
+        verifier, release = blocked_verifier()
+        controller = nonce_controller()
+        app = BitIdWSGIApp(CALLBACK_URI, self.on_login, verifier=verifier, controller=controller)
+        self.assertEqual(503, call_wsgi(app, json_body())["status"])
+        release.set()
+        verifier.shutdown()
+        # The nonce is restored, the wallet can retry
+        app = BitIdWSGIApp(CALLBACK_URI, self.on_login, controller=controller)
+        self.assertEqual(200, call_wsgi(app, json_body())["status"])
+
+    def test_wsgi_login_refused(self):
+        app = BitIdWSGIApp(CALLBACK_URI, lambda addr, nonce: False)
+        res = call_wsgi(app, json_body())
+        self.assertEqual(401, res["status"])
+        self.assertEqual("Login refused", json.loads(res["body"].decode())["message"])
+
+    @unittest.skipIf(asyncio is None, "requires asyncio (Python 3.5+)")
+    def test_asgi_callbacks(self):
+        app = BitIdASGIApp(CALLBACK_URI, self.on_login)
+        self.assertEqual(200, call_asgi(app, json_body())[0])
+        self.assertEqual(401, call_asgi(app, json_body(sign=BAD_SIGNATURE))[0])
+        self.assertEqual(405, call_asgi(app, b"", method="GET")[0])
+        self.assertEqual([(ADDRESS, NONCE)], self.logins)
+
+    @unittest.skipIf(asyncio is None, "requires asyncio (Python 3.5+)")
+    def test_asgi_nonce_checked(self):
+        app = BitIdASGIApp(CALLBACK_URI, self.on_login, controller=nonce_controller())
+        self.assertEqual(200, call_asgi(app, json_body())[0])
+        self.assertEqual(401, call_asgi(app, json_body())[0])
+        self.assertEqual([(ADDRESS, NONCE)], self.logins)
+
+    @unittest.skipIf(asyncio is None, "requires asyncio (Python 3.5+)")
+    def test_asgi_awaitable_on_login(self):
+        logins = []
+        def on_login(addr, nonce):
+            logins.append(addr)
+            return done(len(logins) == 1)
+        app = BitIdASGIApp(CALLBACK_URI, on_login)
+        self.assertEqual(200, call_asgi(app, json_body())[0])
+        self.assertEqual(401, call_asgi(app, json_body())[0])
+        self.assertEqual([ADDRESS, ADDRESS], logins)
+
+    @unittest.skipIf(asyncio is None, "requires asyncio (Python 3.5+)")
+    def test_asgi_overloaded_and_middleware(self):
+        def inner(scope, receive, send):
+            send({"type": "http.response.start", "status": 204, "headers": []})
+            return send({"type": "http.response.body", "body": b""})
+        verifier, release = blocked_verifier()
+        app = BitIdASGIMiddleware(inner, CALLBACK_URI, self.on_login, verifier=verifier)
+        self.assertEqual(503, call_asgi(app, json_body())[0])
+        self.assertEqual(204, call_asgi(app, b"", path="/other")[0])
+        release.set()
+        verifier.shutdown()
+
+    def test_load_local_server(self):
+        # Concurrent clients against an in-process server with a small verifier:
+        # every request is either verified (200) or shed (503), never queued without limit
+        verifier = BoundedVerifier(max_workers=1, max_pending=2)
+        app = BitIdWSGIApp(CALLBACK_URI, self.on_login, verifier=verifier)
+        server = make_server("127.0.0.1", 0, app, server_class=ThreadingWSGIServer, handler_class=QuietHandler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        url = "http://127.0.0.1:%d/callback" % server.server_port
+        statuses, lock = [], threading.Lock()
+
+        def client():
+            for i in range(LOAD_REQUESTS):
+                req = Request(url, data=json_body(), headers={"Content-Type": "application/json"})
+                try:
+                    status = urlopen(req, timeout=30).getcode()
+                except HTTPError as e:
+                    status = e.code
+                with lock: statuses.append(status)
+
+        try:
+            clients = [threading.Thread(target=client) for i in range(LOAD_CLIENTS)]
+            for c in clients: c.start()
+            for c in clients: c.join()
+        finally:
+            server.shutdown()
+            server.server_close()
+            verifier.shutdown()
+
+        self.assertEqual(LOAD_CLIENTS * LOAD_REQUESTS, len(statuses))
+        self.assertEqual(set(), set(statuses) - set([200, 503]))
+        self.assertEqual(statuses.count(200), len(self.logins))
+        self.assertEqual(statuses.count(503), verifier.rejected)
+        self.assertTrue(statuses.count(200) > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
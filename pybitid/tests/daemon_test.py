@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+'''
+Version: 0.0.4
+UnitTest of the batching verification daemon and of the batch verification
+'''
+import os
+import sys
+import time
+import base64
+import shutil
+import tempfile
+import threading
+import unittest
+import pybitid.pybitcointools as bittools
+from pybitid.tests import (CALLBACK_URI, BITID_URI, ADDRESS, SIGNATURE, BAD_SIGNATURE,
+                           CALLBACK_URI_TEST, BITID_URI_TEST, ADDRESS_TEST, SIGNATURE_TEST)
+
+
+CALLBACKS         = [CALLBACK_URI]
+
+# The daemon requires Python 3.7+
+if sys.version_info >= (3, 7):
+    import asyncio
+    from pybitid import daemon, loadgen
+
+
+@unittest.skipIf(sys.version_info < (3, 7), "requires Python 3.7+")
+class DaemonTestCase(unittest.TestCase):
+
+    def test_bin_signature_verify_many(self):
+        vb, h160 = bittools.b58check_to_bin(ADDRESS.encode())
+        vbt, h160t = bittools.b58check_to_bin(ADDRESS_TEST.encode())
+        sig, sigt = base64.b64decode(SIGNATURE), base64.b64decode(SIGNATURE_TEST)
+        items = [
+            (BITID_URI.encode(), sig, h160, vb),
+            (BITID_URI_TEST.encode(), sigt, h160t, vbt),
+            (BITID_URI.encode() + b"0", sig, h160, vb),
+            (BITID_URI.encode(), sig[:64], h160, vb),
+            (BITID_URI.encode(), b"\x20" + b"\x00" * 64, h160, vb),
+        ]
+        results = bittools.bin_signature_verify_many(items)
+        self.assertEqual([True, True, False, False, False], [r.valid for r in results])
+        self.assertEqual([bittools.bin_signature_verify(*item) for item in items], results)
+        self.assertEqual([], bittools.bin_signature_verify_many([]))
+
+    def test_verify_batch(self):
+        requests = [
+            {"address": ADDRESS, "signature": SIGNATURE, "uri": BITID_URI},
+            {"address": ADDRESS, "signature": SIGNATURE, "uri": BITID_URI, "callback": CALLBACK_URI},
+            {"address": ADDRESS, "signature": SIGNATURE, "uri": BITID_URI, "callback": "https://other.com/callback"},
+            {"address": ADDRESS, "signature": BAD_SIGNATURE, "uri": BITID_URI},
+            {"address": ADDRESS, "signature": "garbage!", "uri": BITID_URI},
+            {"address": ADDRESS},
+            {"address": 42, "signature": None, "uri": []},
+            {"address": ADDRESS, "signature": SIGNATURE, "uri": BITID_URI, "callback": ["unhashable"]},
+        ]
+        self.assertEqual([True, True, False, False, False, False, False, False], daemon.verify_batch(requests, CALLBACKS))
+        req = {"address": ADDRESS_TEST, "signature": SIGNATURE_TEST, "uri": BITID_URI_TEST}
+        callbacks = [CALLBACK_URI_TEST]
+        self.assertEqual([True], daemon.verify_batch([req], callbacks, True))
+        self.assertEqual([False], daemon.verify_batch([req], callbacks))
+
+    def test_verify_batch_rejects_other_sites(self):
+        # Challenge signed on another site: the callback embedded in the uri (or given in the request) isn't accepted
+        req = {"address": ADDRESS_TEST, "signature": SIGNATURE_TEST, "uri": BITID_URI_TEST}
+        self.assertEqual([False], daemon.verify_batch([req], CALLBACKS, True))
+        req["callback"] = CALLBACK_URI_TEST
+        self.assertEqual([False], daemon.verify_batch([req], CALLBACKS, True))
+        self.assertRaises(ValueError, daemon.BatchingServer, "/tmp/unused.sock", [])
+
+    def test_verify_batch_requires_callback_with_several_sites(self):
+        # With several accepted sites, a request must give its callback (the one embedded in the uri isn't trusted)
+        callbacks = [CALLBACK_URI, CALLBACK_URI_TEST]
+        req = {"address": ADDRESS_TEST, "signature": SIGNATURE_TEST, "uri": BITID_URI_TEST}
+        self.assertEqual([False], daemon.verify_batch([req], callbacks, True))
+        req["callback"] = CALLBACK_URI
+        self.assertEqual([False], daemon.verify_batch([req], callbacks, True))
+        req["callback"] = CALLBACK_URI_TEST
+        self.assertEqual([True], daemon.verify_batch([req], callbacks, True))
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "pybitid.sock")
+        self.loop, self.thread, self.server = None, None, None
+        self.verify_batch = daemon.verify_batch
+
+    def tearDown(self):
+        daemon.verify_batch = self.verify_batch
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.server.close)
+            asyncio.run_coroutine_threadsafe(self.server.wait_closed(), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.loop.close()
+        shutil.rmtree(self.tmpdir)
+
+    def serve(self, **kwargs):
+        self.loop = asyncio.new_event_loop()
+        self.server = daemon.BatchingServer(self.path, CALLBACKS, **kwargs)
+        self.loop.run_until_complete(self.server.start())
+        self.thread = threading.Thread(target=self.loop.run_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self.server
+
+    def slow_verify_batch(self, delay):
+        def verify_batch(*args):
+            time.sleep(delay)
+            return self.verify_batch(*args)
+        daemon.verify_batch = verify_batch
+
+    def pipeline(self, count, delay=0):
+        client = daemon.DaemonClient(self.path, timeout=30)
+        try:
+            for i in range(count):
+                req = {"id": i, "address": ADDRESS, "signature": SIGNATURE, "uri": BITID_URI}
+                client.sock.sendall(daemon.encode_frame(req))
+                if delay: time.sleep(delay)
+            return [client.receive() for i in range(count)]
+        finally:
+            client.close()
+
+    def test_server_and_client(self):
+        server = self.serve(window=0.05)
+        results = []
+        def verify(sign):
+            client = daemon.DaemonClient(self.path, timeout=30)
+            try:
+                results.append((sign, client.verify(ADDRESS, sign, BITID_URI, CALLBACK_URI)))
+            finally:
+                client.close()
+        threads = [threading.Thread(target=verify, args=(s,)) for s in (SIGNATURE, SIGNATURE, BAD_SIGNATURE)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        client = daemon.DaemonClient(self.path, timeout=30)
+        client.sock.sendall(daemon.HEADER.pack(3) + b"{x}")
+        self.assertEqual({"id": None, "valid": False, "error": "malformed"}, client.receive())
+        client.close()
+        self.assertEqual(sorted([(SIGNATURE, True), (SIGNATURE, True), (BAD_SIGNATURE, False)]), sorted(results))
+        self.assertEqual(3, server.stats["requests"])
+        self.assertTrue(server.stats["batches"] < 3)
+        self.assertEqual(1, server.stats["malformed"])
+
+    def test_requests_accumulate_while_verifying(self):
+        # One request every 5 ms, batches taking 50 ms: requests received during a batch go in the next one
+        self.slow_verify_batch(0.05)
+        server = self.serve(window=0.001)
+        responses = self.pipeline(20, 0.005)
+        self.assertEqual([{"id": i, "valid": True} for i in range(20)], responses)
+        self.assertTrue(server.stats["batches"] <= 5)
+
+    def test_back_pressure(self):
+        self.slow_verify_batch(0.01)
+        server = self.serve(window=0.001, max_batch=2, max_pending=2)
+        responses = []
+        threads = [threading.Thread(target=lambda: responses.append(self.pipeline(10))) for i in range(4)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        self.assertEqual([[{"id": i, "valid": True} for i in range(10)]] * 4, responses)
+        self.assertEqual(2, server.stats["max_batch"])
+        self.assertTrue(server.stats["throttled"] > 0)
+
+    def test_loadgen(self):
+        report = asyncio.run(loadgen.run(clients=4, requests=3))
+        self.assertEqual(12, report["requests"])
+        self.assertEqual(0, report["failures"])
+        self.assertTrue(report["p99_ms"] >= report["p50_ms"] > 0)
+        self.assertTrue(report["daemon"]["batches"] <= 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
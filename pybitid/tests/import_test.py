@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+'''
+Version: 0.0.4
+Import time benchmark (python -X importtime) and checks of the lazy initialization
+Usage (benchmark):
+    python -m pybitid.tests.import_test --bench
+'''
+import sys
+import subprocess
+import unittest
+
+LAZY_MODULES      = ("urllib.parse", "urlparse", "random", "re", "base64", "collections", "threading")
+
+
+def import_times(statement):
+    '''
+    Runs a statement in a new interpreter with -X importtime
+    Returns a dict {module: cumulative import time in microseconds}
+    '''
+    proc = subprocess.Popen([sys.executable, "-X", "importtime", "-c", statement],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = proc.communicate()
+    if proc.returncode != 0: raise RuntimeError(err.decode())
+    times = {}
+    for line in err.decode().splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit(): continue
+        times[parts[2].strip()] = int(parts[1])
+    return times
+
+
+def run(statement):
+    return subprocess.call([sys.executable, "-c", statement]) == 0
+
+
+class ImportTestCase(unittest.TestCase):
+
+    @unittest.skipIf(sys.version_info < (3, 7), "requires python -X importtime (Python 3.7+)")
+    def test_lazy_modules_not_imported(self):
+        baseline = import_times("pass")
+        times = import_times("import pybitid.bitid")
+        self.assertIn("pybitid.bitid", times)
+        for module in LAZY_MODULES:
+            if module in baseline: continue
+            self.assertNotIn(module, times)
+
+    def test_no_tables_built_at_import(self):
+        self.assertTrue(run("import pybitid.bitid as bitid, pybitid.pybitcointools as t; "
+                            "assert not (bitid._URL_FUNCS or t._G_TABLE or t._MSG_PREFIX_SHA256 or t._CODE_STRING_256)"))
+
+    def test_warmup(self):
+        self.assertTrue(run("import sys, pybitid; pybitid.warmup(); import pybitid.bitid as bitid, pybitid.pybitcointools as t; "
+                            "assert bitid._URL_FUNCS and t._G_TABLE and t._MSG_PREFIX_SHA256 and t._CODE_STRING_256; "
+                            "assert 'random' in sys.modules"))
+
+    def test_url_wrappers_forward_arguments(self):
+        import pybitid.bitid as bitid
+        self.assertEqual({"a": [""]}, bitid.parse_qs("a=", keep_blank_values=True))
+        self.assertEqual("a%2Fb", bitid.quote("a/b", safe=""))
+        self.assertEqual("https", bitid.urlparse("//localhost/callback", scheme="https").scheme)
+        self.assertEqual("bitid://localhost/callback", bitid.urlunparse(("bitid", "localhost", "/callback", "", "", "")))
+
+
+def main():
+    times = import_times("import pybitid.bitid")
+    sys.stdout.write("import pybitid.bitid: %.1f ms\n" % (times["pybitid.bitid"] / 1000.0))
+    for module, t in sorted(times.items(), key=lambda item: -item[1])[1:6]:
+        sys.stdout.write("    %-30s %6.1f ms\n" % (module, t / 1000.0))
+    return 0
+
+
+if __name__ == '__main__':
+    if "--bench" in sys.argv: sys.exit(main())
+    unittest.main()
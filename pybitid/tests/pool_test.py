@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+'''
+Version: 0.0.4
+UnitTest of the challenge pool
+'''
+import time
+import unittest
+import pybitid.bitid as bitid
+import pybitid.pool as pool
+import pybitid.admission as admission
+from pybitid.tests import CALLBACK_URI, FakeClock
+
+
+UNSECURE_URI      = "http://localhost:3000/callback"
+
+
+class PoolTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_challenges(self):
+        challenge_pool = pool.ChallengePool(UNSECURE_URI, size=4, low_water=2, ttl=60, clock=self.clock)
+        self.assertEqual(4, challenge_pool.fill())
+        challenges = [challenge_pool.get() for i in range(4)]
+        self.assertEqual(4, len(set(c.nonce for c in challenges)))
+        for c in challenges:
+            self.assertTrue(bitid.uri_valid(c.uri, UNSECURE_URI))
+            self.assertEqual(c.nonce, bitid.extract_nonce(c.uri))
+            self.assertEqual(bitid.qrcode(c.uri), c.qrcode)
+            self.assertEqual(1060.0, c.expires)
+
+    def test_invalid_callback(self):
+        self.assertRaises(BaseException, pool.ChallengePool, "localhost/callback")
+
+    def test_hits_misses_and_expiry(self):
+        challenge_pool = pool.ChallengePool(CALLBACK_URI, size=2, low_water=1, ttl=60, clock=self.clock)
+        challenge_pool.fill()
+        challenge_pool.get()
+        challenge_pool.get()
+        # Empty pool: challenge generated on the request path
+        self.assertTrue(bitid.uri_valid(challenge_pool.get().uri, CALLBACK_URI))
+        self.clock.now += 5
+        self.assertEqual(2, challenge_pool.fill())
+        stats = challenge_pool.stats()
+        self.assertEqual((2, 1, 2), (stats["hits"], stats["misses"], stats["available"]))
+        self.assertAlmostEqual(2 / 3.0, stats["hit_rate"])
+        self.assertEqual(5000.0, stats["refill_lag_ms"])
+        # Challenges past half of their lifetime are dropped
+        self.clock.now += 31
+        self.assertEqual(2, challenge_pool.fill())
+        self.assertEqual(2, challenge_pool.stats()["expired"])
+        self.assertEqual(1096.0, challenge_pool.get().expires)
+
+    def test_min_ttl(self):
+        challenge_pool = pool.ChallengePool(CALLBACK_URI, size=2, low_water=1, ttl=600, min_ttl=120, clock=self.clock)
+        challenge_pool.fill()
+        self.clock.now += 480
+        # 120 seconds left: still served
+        self.assertEqual(1600.0, challenge_pool.get().expires)
+        self.clock.now += 1
+        # Less than 120 seconds left: dropped, a fresh challenge is generated
+        self.assertEqual(2081.0, challenge_pool.get().expires)
+        stats = challenge_pool.stats()
+        self.assertEqual((1, 1, 1), (stats["hits"], stats["misses"], stats["expired"]))
+
+    def test_admission_controller(self):
+        ctrl = admission.AdmissionController(clock=self.clock)
+        challenge_pool = pool.ChallengePool(CALLBACK_URI, size=2, controller=ctrl, clock=self.clock)
+        challenge_pool.fill()
+        self.assertEqual(0, ctrl.stats()["nonces"])
+        challenge = challenge_pool.get()
+        self.assertEqual(admission.ACCEPTED, ctrl.admit(challenge.uri)[0])
+
+    def test_nonce_ttl_counted_from_generation(self):
+        ctrl = admission.AdmissionController(nonce_ttl=600, clock=self.clock)
+        challenge_pool = pool.ChallengePool(CALLBACK_URI, size=2, ttl=600, controller=ctrl, clock=self.clock)
+        challenge_pool.fill()
+        # Served 299 seconds after its generation (just before min_ttl)
+        self.clock.now += 299
+        challenge = challenge_pool.get()
+        self.assertEqual(1600.0, challenge.expires)
+        self.clock.now = challenge.expires + 1
+        self.assertEqual(admission.REJECT_EXPIRED, ctrl.admit(challenge.uri)[0])
+
+    def test_background_refill(self):
+        challenge_pool = pool.ChallengePool(CALLBACK_URI, size=8, low_water=4)
+        challenge_pool.start()
+        try:
+            nonces = set(challenge_pool.get().nonce for i in range(20))
+            deadline = time.time() + 5
+            while challenge_pool.stats()["available"] < 4 and time.time() < deadline: time.sleep(0.01)
+        finally:
+            challenge_pool.close()
+        stats = challenge_pool.stats()
+        self.assertEqual(20, len(nonces))
+        self.assertTrue(4 <= stats["available"] <= 8)
+        self.assertEqual(20, stats["hits"] + stats["misses"])
+        self.assertTrue(stats["generated"] >= stats["hits"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+'''
+Version: 0.0.4
+Benchmark of repeated signers verifications with and without the precomputed tables cache
+Usage:
+    python -m pybitid.tests.precompute_bench [iterations]
+'''
+import sys
+import time
+import base64
+import pybitid.pybitcointools as bittools
+from pybitid.tests import BITID_URI, ADDRESS, SIGNATURE
+
+MESSAGE           = BITID_URI.encode()
+ITERATIONS        = 500
+
+
+def run(iterations, registry):
+    vbyte, h160 = bittools.b58check_to_bin(ADDRESS.encode())
+    sig = base64.b64decode(SIGNATURE)
+    # First login fills the registry (and the cache)
+    assert bittools.bin_signature_verify(MESSAGE, sig, h160, vbyte, registry).valid
+    start = time.time()
+    for i in range(iterations):
+        assert bittools.bin_signature_verify(MESSAGE, sig, h160, vbyte, registry).valid
+    return iterations / (time.time() - start)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    iterations = int(argv[0]) if argv else ITERATIONS
+    bittools.generator_table()
+    tables = bittools.PrecomputeCache()
+    results = [
+        ("recovery (no registry)", run(iterations, None)),
+        ("registry, cache disabled", run(iterations, bittools.PubkeyRegistry())),
+        ("registry, cache enabled", run(iterations, bittools.PubkeyRegistry(tables=tables))),
+    ]
+    for name, throughput in results:
+        sys.stdout.write("%-28s %8.1f verifications/s\n" % (name, throughput))
+    sys.stdout.write("cache: %s\n" % tables.stats())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+'''
+Version: 0.0.4
+UnitTest of pybitcointools functions
+'''
+import base64
+import unittest
+import pybitid.pybitcointools as bittools
+import pybitid.tests as data
+
+
+MESSAGE           = data.BITID_URI.encode()
+ADDRESS           = data.ADDRESS.encode()
+SIGNATURE         = data.SIGNATURE.encode()
+
+MESSAGE_TEST      = data.BITID_URI_TEST.encode()
+ADDRESS_TEST      = data.ADDRESS_TEST.encode()
+SIGNATURE_TEST    = data.SIGNATURE_TEST.encode()
+
+
+class PyBitcoinToolsTestCase(unittest.TestCase):
+
+    def test_point_arithmetic(self):
+        G = bittools.GPOINT
+        self.assertTrue(G.on_curve())
+        self.assertEqual(G + G, G * 2)
+        self.assertEqual(G * 3, 2 * G + G)
+        self.assertTrue((G * bittools.N).is_inf())
+        self.assertTrue((G + -G).is_inf())
+        self.assertEqual(bittools.base10_multiply(bittools.G, 3), (G * 3).xy)
+        self.assertEqual(bittools.base10_add(bittools.G, bittools.base10_double(bittools.G)), (G * 3).xy)
+
+    def test_public_key_serializations(self):
+        point = bittools.GPOINT * 12345
+        for formt in ('bin', 'bin_compressed', 'hex', 'hex_compressed'):
+            pub = bittools.PublicKey.parse(bittools.encode_pubkey(point.xy, formt))
+            self.assertEqual(point, pub.point)
+            self.assertEqual(formt.endswith('compressed'), pub.compressed)
+            self.assertEqual(bittools.encode_pubkey(point.xy, 'bin'), pub.serialize(False))
+            self.assertEqual(bittools.encode_pubkey(point.xy, 'bin_compressed'), pub.serialize(True))
+            self.assertEqual(bittools.bin_hash160(pub.serialize()), pub.hash160())
+            self.assertEqual(bittools.pubkey_to_address(pub.serialize()), pub.address())
+
+    def test_signature_recover(self):
+        sig = bittools.Signature.from_base64(SIGNATURE)
+        self.assertEqual(bittools.decode_sig(SIGNATURE), sig.to_tuple())
+        self.assertTrue(sig.compressed)
+        msghash = bittools.electrum_sig_hash(MESSAGE)
+        pub = sig.recover(msghash)
+        self.assertEqual(ADDRESS, pub.address())
+        self.assertTrue(sig.verify(msghash, pub))
+        self.assertTrue(bittools.ecdsa_raw_verify(msghash, sig.to_tuple(), pub.to_tuple()))
+        self.assertFalse(sig.verify(bittools.electrum_sig_hash(MESSAGE_TEST), pub))
+        self.assertEqual(pub.to_tuple(), bittools.ecdsa_raw_recover(msghash, sig.to_tuple()))
+
+    def test_mul_add(self):
+        G, Q = bittools.GPOINT, bittools.GPOINT * 987654321
+        self.assertEqual(G * 5 + Q * 7, G.mul_add(5, Q, 7))
+        self.assertEqual(G * 5, G.mul_add(5, Q, 0))
+        self.assertTrue(G.mul_add(1, -G, 1).is_inf())
+
+    def test_pubkey_registry(self):
+        registry = bittools.PubkeyRegistry(max_size=1)
+        vbyte, h160 = bittools.b58check_to_bin(ADDRESS)
+        sig = base64.b64decode(SIGNATURE)
+        first = bittools.bin_signature_verify(MESSAGE, sig, h160, vbyte, registry)
+        self.assertTrue(first.valid)
+        self.assertEqual(first.pubkey, registry.get(h160).serialize())
+        # Known address: direct verification against the stored key
+        second = bittools.bin_signature_verify(MESSAGE, sig, h160, vbyte, registry)
+        self.assertEqual(first, second)
+        self.assertFalse(bittools.bin_signature_verify(MESSAGE + b"0", sig, h160, vbyte, registry).valid)
+        # Header byte with the wrong parity of R is rejected as with a recovery
+        bad_parity = bittools.i2b(bittools.b2i(sig[0]) ^ 1) + sig[1:]
+        self.assertFalse(bittools.bin_signature_verify(MESSAGE, bad_parity, h160, vbyte).valid)
+        self.assertFalse(bittools.bin_signature_verify(MESSAGE, bad_parity, h160, vbyte, registry).valid)
+        # Bounded size
+        vbyte, h160_test = bittools.b58check_to_bin(ADDRESS_TEST)
+        self.assertTrue(bittools.bin_signature_verify(MESSAGE_TEST, base64.b64decode(SIGNATURE_TEST), h160_test, vbyte, registry).valid)
+        self.assertEqual(1, len(registry))
+        self.assertIsNone(registry.get(h160))
+
+    def test_wnaf(self):
+        for n in (1, 2, 255, 12345678901234567890, bittools.N - 1):
+            for w in (2, 4, 8):
+                digits = bittools.wnaf(n, w)
+                self.assertEqual(n, sum(d << i for i, d in enumerate(digits)))
+        G, Q = bittools.GPOINT, bittools.GPOINT * 987654321
+        res = bittools.jacobian_wnaf_multiply([(bittools.generator_table(), bittools.G_WINDOW, 5),
+                                               (bittools.odd_multiples(Q.jac, 5), 5, 7)])
+        self.assertEqual(G.mul_add(5, Q, 7), bittools.Point(*res))
+
+    def test_precompute_cache(self):
+        sig = bittools.Signature.from_base64(SIGNATURE)
+        msghash = bittools.electrum_sig_hash(MESSAGE)
+        pub = sig.recover(msghash)
+        cache = bittools.PrecomputeCache(window=5)
+        self.assertTrue(sig.verify(msghash, pub, tables=cache))
+        self.assertTrue(sig.verify(msghash, pub, tables=cache))
+        self.assertFalse(sig.verify(bittools.electrum_sig_hash(MESSAGE_TEST), pub, tables=cache))
+        stats = cache.stats()
+        self.assertEqual((1, 2), (stats["misses"], stats["hits"]))
+        self.assertEqual(8, len(cache.get(pub.point)))
+        self.assertTrue(stats["memory"] > 0)
+        # Memory limit
+        small = bittools.PrecomputeCache(max_bytes=stats["memory"], window=5)
+        small.get(pub.point)
+        small.get(bittools.GPOINT * 3)
+        self.assertEqual(1, len(small))
+        self.assertEqual(1, small.stats()["evictions"])
+        self.assertTrue(small.memory <= small.max_bytes)
+
+    def test_registry_with_precompute_cache(self):
+        registry = bittools.PubkeyRegistry(tables=bittools.PrecomputeCache())
+        vbyte, h160 = bittools.b58check_to_bin(ADDRESS)
+        sig = base64.b64decode(SIGNATURE)
+        for i in range(3):
+            self.assertTrue(bittools.bin_signature_verify(MESSAGE, sig, h160, vbyte, registry).valid)
+        self.assertEqual(1, registry.tables.stats()["hits"])
+
+    def test_electrum_sig_hash(self):
+        for msg in (b"", MESSAGE, b"x" * 300):
+            padded = b"\x18Bitcoin Signed Message:\n" + bittools.num_to_var_int(len(msg)) + msg
+            self.assertEqual(bittools.bin_dbl_sha256(padded), bittools.electrum_sig_hash(msg))
+
+    def test_electrum_sig_hashes(self):
+        msgs = [MESSAGE, MESSAGE_TEST]
+        hashes = bittools.electrum_sig_hashes(msgs)
+        self.assertEqual([bittools.electrum_sig_hash(m) for m in msgs], hashes)
+
+    def test_b58check_to_bin(self):
+        vbyte, h160 = bittools.b58check_to_bin(ADDRESS)
+        self.assertEqual(0, vbyte)
+        self.assertEqual(20, len(h160))
+        self.assertEqual(ADDRESS, bittools.bin_to_b58check(h160, vbyte))
+        vbyte, h160 = bittools.b58check_to_bin(ADDRESS_TEST)
+        self.assertEqual(111, vbyte)
+
+    def test_bin_signature_verify(self):
+        vbyte, h160 = bittools.b58check_to_bin(ADDRESS)
+        res = bittools.bin_signature_verify(MESSAGE, base64.b64decode(SIGNATURE), h160, vbyte)
+        self.assertTrue(res.valid)
+        self.assertTrue(res.compressed)
+        self.assertEqual(33, len(res.pubkey))
+        self.assertEqual(ADDRESS, bittools.pubkey_to_address(res.pubkey, vbyte))
+
+    def test_bin_signature_verify_testnet(self):
+        vbyte, h160 = bittools.b58check_to_bin(ADDRESS_TEST)
+        res = bittools.bin_signature_verify(MESSAGE_TEST, base64.b64decode(SIGNATURE_TEST), h160, vbyte)
+        self.assertTrue(res.valid)
+
+    def test_fail_bin_signature_verify_if_message_doesnt_match(self):
+        vbyte, h160 = bittools.b58check_to_bin(ADDRESS)
+        res = bittools.bin_signature_verify(MESSAGE + b"0", base64.b64decode(SIGNATURE), h160, vbyte)
+        self.assertFalse(res.valid)
+
+    def test_fail_bin_signature_verify_if_bad_lengths(self):
+        vbyte, h160 = bittools.b58check_to_bin(ADDRESS)
+        sig = base64.b64decode(SIGNATURE)
+        self.assertFalse(bittools.bin_signature_verify(MESSAGE, sig[:64], h160, vbyte).valid)
+        self.assertFalse(bittools.bin_signature_verify(MESSAGE, sig, h160[:19], vbyte).valid)
+
+    def test_fail_bin_signature_verify_if_header_out_of_range(self):
+        # Header bytes outside 27..34 are rejected (they were accepted when their parity matched)
+        vbyte, h160 = bittools.b58check_to_bin(ADDRESS)
+        sig = base64.b64decode(SIGNATURE)
+        for v in (0, 24, 26, 35, 36, 255):
+            bad_sig = bytes(bytearray([v])) + sig[1:]
+            self.assertFalse(bittools.bin_signature_verify(MESSAGE, bad_sig, h160, vbyte).valid)
+            self.assertFalse(bittools.signature_verify(MESSAGE.decode(), base64.b64encode(bad_sig).decode(), ADDRESS.decode()))
+
+    def test_signature_verify(self):
+        msg, sig, addr = MESSAGE.decode(), SIGNATURE.decode(), ADDRESS.decode()
+        self.assertTrue(bittools.signature_verify(msg, sig, addr))
+        self.assertFalse(bittools.signature_verify(msg, sig, addr, True))
+        msg, sig, addr = MESSAGE_TEST.decode(), SIGNATURE_TEST.decode(), ADDRESS_TEST.decode()
+        self.assertTrue(bittools.signature_verify(msg, sig, addr, True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,6 +9,7 @@ Requires:
 '''
 import unittest
 import pybitid.bitid as bitid
+import pybitid.pybitcointools as bittools
 try:
     from urllib import quote
     from urlparse import urlparse, parse_qs
@@ -109,6 +110,14 @@ class PyBitIdTestCase(unittest.TestCase):
         is_valid = bitid.signature_valid(ADDRESS, SIGNATURE, bitid_uri, SEC_CALLBACK_URI)
         self.assertTrue(is_valid)
     
+    def test_verify_signature_with_registry(self):
+        registry = bittools.PubkeyRegistry()
+        bitid_uri = bitid.build_uri(SEC_CALLBACK_URI, NONCE)
+        for i in range(2):
+            self.assertTrue(bitid.challenge_valid(ADDRESS, SIGNATURE, bitid_uri, SEC_CALLBACK_URI, registry=registry))
+            self.assertEqual(1, len(registry))
+        self.assertFalse(bitid.signature_valid(ADDRESS, SIGNATURE, BITID_URI + "0", SEC_CALLBACK_URI, registry=registry))
+    
     def test_fail_verification_if_invalid_signature(self):
         bitid_uri = bitid.build_uri(CALLBACK_URI, NONCE)
         is_valid = bitid.signature_valid(ADDRESS, "garbage", bitid_uri, CALLBACK_URI)
@@ -120,6 +129,11 @@ class PyBitIdTestCase(unittest.TestCase):
         is_valid = bitid.signature_valid(ADDRESS, bad_signature, bitid_uri, CALLBACK_URI)
         self.assertFalse(is_valid)
     
+    def test_extract_callback(self):
+        self.assertEqual(SEC_CALLBACK_URI, bitid.extract_callback(BITID_URI))
+        self.assertEqual(CALLBACK_URI, bitid.extract_callback(bitid.build_uri(CALLBACK_URI, NONCE)))
+        self.assertIsNone(bitid.extract_callback("garbage"))
+    
     def test_generate_nonce(self):
         len_nonce = len(bitid.generate_nonce())
         self.assertEqual(NONCE_LENGTH, len_nonce)  
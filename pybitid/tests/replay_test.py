@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+'''
+Version: 0.0.4
+UnitTest of callback log replay
+'''
+import os
+import json
+import shutil
+import tempfile
+import unittest
+import pybitid.replay as replay
+from pybitid.tests import CALLBACK_URI, BITID_URI, ADDRESS, SIGNATURE, BAD_SIGNATURE
+
+
+def record(addr=ADDRESS, sign=SIGNATURE, uri=BITID_URI):
+    return json.dumps({"address": addr, "signature": sign, "uri": uri})
+
+RECORDS = [
+    record(),
+    record(sign=BAD_SIGNATURE),
+    record(addr="garbage"),
+    record(uri=BITID_URI + "&u=1"),
+    "{not json",
+    json.dumps({"address": ADDRESS}),
+    record(addr=123),
+    record(uri=5),
+    # Challenge signed for another site (callback embedded in the uri)
+    record(uri="bitid://evil.com/callback?x=fe32e61882a71074"),
+]
+EXPECTED = [replay.RESULT_VALID, replay.REASON_SIGNATURE, replay.REASON_ADDRESS,
+            replay.REASON_URI, replay.REASON_MALFORMED, replay.REASON_MALFORMED,
+            replay.REASON_MALFORMED, replay.REASON_MALFORMED, replay.REASON_URI]
+
+
+class ReplayTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_check_record(self):
+        self.assertEqual(EXPECTED, [replay.check_record(r, CALLBACK_URI) for r in RECORDS])
+
+    def test_check_record_with_other_callback(self):
+        self.assertEqual(replay.REASON_URI, replay.check_record(RECORDS[0], "https://localhost:3000/other"))
+        self.assertEqual(replay.REASON_URI, replay.check_record(record(uri="garbage"), CALLBACK_URI))
+
+    def test_replay(self):
+        report = replay.replay(iter(RECORDS), CALLBACK_URI, chunk_size=4)
+        self.assertEqual(len(RECORDS), report["processed"])
+        self.assertEqual(1, report["counts"][replay.RESULT_VALID])
+        self.assertEqual(4, report["counts"][replay.REASON_MALFORMED])
+        self.assertEqual(1, report["counts"][replay.REASON_SIGNATURE])
+        self.assertEqual(2, report["counts"][replay.REASON_URI])
+
+    def test_replay_parallel(self):
+        report = replay.replay(iter(RECORDS * 3), CALLBACK_URI, processes=2, chunk_size=2)
+        self.assertEqual(3 * len(RECORDS), report["processed"])
+        self.assertEqual(12, report["counts"][replay.REASON_MALFORMED])
+
+    def interrupted_replay(self, count, callback_uri, checkpoint):
+        # Replay interrupted after count records
+        def lines():
+            for line in RECORDS[:count]: yield line
+            raise KeyboardInterrupt()
+        self.assertRaises(KeyboardInterrupt, replay.replay, lines(), callback_uri, chunk_size=2, checkpoint=checkpoint)
+
+    def test_replay_resumes_from_checkpoint(self):
+        checkpoint = os.path.join(self.tmpdir, "checkpoint")
+        self.interrupted_replay(4, CALLBACK_URI, checkpoint)
+        report = replay.replay(iter(RECORDS), CALLBACK_URI, chunk_size=2, checkpoint=checkpoint)
+        self.assertEqual(4, report["resumed_at"])
+        self.assertEqual(len(RECORDS) - 4, report["processed"])
+        self.assertEqual(len(RECORDS), report["total"])
+        self.assertEqual(1, report["counts"][replay.RESULT_VALID])
+        self.assertEqual(4, report["counts"][replay.REASON_MALFORMED])
+
+    def test_checkpoint_of_other_run_is_not_resumed(self):
+        checkpoint = os.path.join(self.tmpdir, "checkpoint")
+        # Interrupted run with another callback
+        self.interrupted_replay(4, "https://evil.com/callback", checkpoint)
+        report = replay.replay(iter(RECORDS), CALLBACK_URI, chunk_size=2, checkpoint=checkpoint)
+        self.assertEqual(0, report["resumed_at"])
+        self.assertEqual(len(RECORDS), report["processed"])
+        self.assertEqual(1, report["counts"][replay.RESULT_VALID])
+        self.assertEqual(2, report["counts"][replay.REASON_URI])
+        # Finished run: the next run starts over (e.g. the log has grown)
+        report = replay.replay(iter(RECORDS * 2), CALLBACK_URI, chunk_size=2, checkpoint=checkpoint)
+        self.assertEqual(0, report["resumed_at"])
+        self.assertEqual(2, report["counts"][replay.RESULT_VALID])
+        # Other network or other log
+        self.interrupted_replay(4, CALLBACK_URI, checkpoint)
+        report = replay.replay(iter(RECORDS), CALLBACK_URI, True, chunk_size=2, checkpoint=checkpoint)
+        self.assertEqual(0, report["resumed_at"])
+        self.interrupted_replay(4, CALLBACK_URI, checkpoint)
+        report = replay.replay(iter(RECORDS), CALLBACK_URI, chunk_size=2, checkpoint=checkpoint, source="other.jsonl")
+        self.assertEqual(0, report["resumed_at"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+'''
+Version: 0.0.4
+Benchmark of the RIPEMD-160 implementations (pure python fallback vs hashlib) and of hash160_many()
+Usage:
+    python -m pybitid.tests.ripemd160_bench [iterations]
+'''
+import os
+import sys
+import time
+import hashlib
+import pybitid.pybitcointools as bittools
+from pybitid.ripemd160 import ripemd160
+
+ITERATIONS        = 10000
+
+
+def throughput(fn, data, iterations):
+    start = time.time()
+    for i in range(iterations): fn(data)
+    return iterations / (time.time() - start)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    iterations = int(argv[0]) if argv else ITERATIONS
+    data = os.urandom(32)
+    results = [("pure python (32 bytes)", throughput(ripemd160, data, iterations))]
+    try:
+        hashlib.new('ripemd160', b'')
+        results.append(("hashlib (32 bytes)", throughput(lambda x: hashlib.new('ripemd160', x).digest(), data, iterations)))
+    except ValueError:
+        sys.stdout.write("hashlib: ripemd160 not available\n")
+    pubkeys = [b"\x02" + os.urandom(32) for i in range(iterations)]
+    start = time.time()
+    bittools.hash160_many(pubkeys)
+    results.append(("hash160_many (33 bytes)", iterations / (time.time() - start)))
+    for name, value in results:
+        sys.stdout.write("%-28s %10.0f hashes/s\n" % (name, value))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+'''
+Version: 0.0.4
+UnitTest of the pure python RIPEMD-160 (test vectors from the RIPEMD-160 specification)
+'''
+import hashlib
+import binascii
+import unittest
+import pybitid.pybitcointools as bittools
+from pybitid import ripemd160
+from pybitid.tests import BITID_URI, ADDRESS, SIGNATURE
+
+
+VECTORS = [
+    (b"", "9c1185a5c5e9fc54612808977ee8f548b2258d31"),
+    (b"a", "0bdc9d2d256b3ee9daae347be6f4dc835a467ffe"),
+    (b"abc", "8eb208f7e05d987a9b044a8e98c6b087f15a0bfc"),
+    (b"message digest", "5d0689ef49d2fae572b881b123a85ffa21595f36"),
+    (b"abcdefghijklmnopqrstuvwxyz", "f71c27109c692c1b56bbdceb5b9d2865b3708dbc"),
+    (b"abcdbcdecdefdefgefghfghighijhijkijkljklmklmnlmnomnopnopq", "12a053384a9c0c88e405a06c27dcf49ada62eb2b"),
+    (b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789", "b0e20b6e3116640286ed3a87a5713079b21f5189"),
+    (b"1234567890" * 8, "9b752e45573d4b39f4dbd3323cab82bf63326bfb"),
+]
+
+MESSAGE           = BITID_URI
+
+
+class Ripemd160TestCase(unittest.TestCase):
+
+    def test_vectors(self):
+        for data, digest in VECTORS:
+            self.assertEqual(digest, ripemd160.new(data).hexdigest())
+            self.assertEqual(binascii.unhexlify(digest), ripemd160.ripemd160(data))
+
+    def test_update_and_copy(self):
+        data = bytes(bytearray(range(256))) * 3
+        h = ripemd160.new(data[:100])
+        c = h.copy()
+        h.update(data[100:])
+        self.assertEqual(ripemd160.ripemd160(data), h.digest())
+        self.assertEqual(ripemd160.ripemd160(data[:100]), c.digest())
+        # digest() doesn't change the state
+        self.assertEqual(h.digest(), h.digest())
+
+    def test_hash160_many(self):
+        data = [b"", b"abc", b"\x02" + b"\x11" * 32]
+        self.assertEqual([bittools.bin_hash160(d) for d in data], bittools.hash160_many(data))
+
+    def test_fallback_when_hashlib_lacks_ripemd160(self):
+        new = hashlib.new
+        def new_without_ripemd160(name, *args):
+            if name == 'ripemd160': raise ValueError("unsupported hash type")
+            return new(name, *args)
+        backend = list(bittools._RIPEMD160)
+        try:
+            del bittools._RIPEMD160[:]
+            hashlib.new = new_without_ripemd160
+            self.assertIs(ripemd160.ripemd160, bittools.ripemd160_backend())
+            self.assertEqual(binascii.unhexlify(VECTORS[2][1]), bittools.ripemd160_backend()(b"abc"))
+            self.assertTrue(bittools.signature_verify(MESSAGE, SIGNATURE, ADDRESS))
+        finally:
+            hashlib.new = new
+            bittools._RIPEMD160[:] = backend
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+'''
+Version: 0.0.4
+Benchmark of session token checks vs full challenge checks
+Usage:
+    python -m pybitid.tests.session_bench [iterations]
+'''
+import sys
+import time
+import pybitid.bitid as bitid
+from pybitid.session import SessionTokens
+from pybitid.tests import CALLBACK_URI, BITID_URI, ADDRESS, SIGNATURE
+
+ITERATIONS        = 500
+
+
+def throughput(fn, iterations):
+    start = time.time()
+    for i in range(iterations): assert fn()
+    return iterations / (time.time() - start)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    iterations = int(argv[0]) if argv else ITERATIONS
+    tokens = SessionTokens([("k1", b"benchmark secret")])
+    token = tokens.issue(ADDRESS, CALLBACK_URI)
+    full = throughput(lambda: bitid.challenge_valid(ADDRESS, SIGNATURE, BITID_URI, CALLBACK_URI), iterations)
+    fast = throughput(lambda: tokens.verify(token, CALLBACK_URI), iterations * 100)
+    sys.stdout.write("challenge_valid   %10.0f checks/s\n" % full)
+    sys.stdout.write("token verify      %10.0f checks/s (x%.0f)\n" % (fast, fast / full))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+'''
+Version: 0.0.4
+UnitTest of the session tokens
+'''
+import unittest
+from pybitid.admission import AdmissionController
+from pybitid.session import SessionTokens
+from pybitid.tests import CALLBACK_URI, BITID_URI, NONCE, ADDRESS, SIGNATURE, BAD_SIGNATURE, FakeClock
+
+
+class SessionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock(1000000.0)
+        self.tokens = SessionTokens([("k1", b"secret1")], ttl=60, clock=self.clock)
+
+    def test_login_and_verify(self):
+        controller = AdmissionController(clock=self.clock)
+        controller.register_nonce(NONCE)
+        self.assertIsNone(self.tokens.login(controller, ADDRESS, BAD_SIGNATURE, BITID_URI, CALLBACK_URI))
+        token = self.tokens.login(controller, ADDRESS, SIGNATURE, BITID_URI, CALLBACK_URI)
+        self.assertEqual(ADDRESS, self.tokens.verify(token, CALLBACK_URI))
+
+    def test_login_consumes_nonce(self):
+        controller = AdmissionController(clock=self.clock)
+        # Nonce never issued by the controller
+        self.assertIsNone(self.tokens.login(controller, ADDRESS, SIGNATURE, BITID_URI, CALLBACK_URI))
+        controller.register_nonce(NONCE)
+        self.assertIsNotNone(self.tokens.login(controller, ADDRESS, SIGNATURE, BITID_URI, CALLBACK_URI))
+        # Replayed signature
+        self.assertIsNone(self.tokens.login(controller, ADDRESS, SIGNATURE, BITID_URI, CALLBACK_URI))
+
+    def test_token_bound_to_site_and_address(self):
+        token = self.tokens.issue(ADDRESS, CALLBACK_URI)
+        self.assertIsNone(self.tokens.verify(token, "https://other.com/callback"))
+        kid, expiry, addr, mac = token.split(".")
+        forged = ".".join((kid, expiry, "1BoatSLRHtKNngkdXEeobR76b53LETtpyT", mac))
+        self.assertIsNone(self.tokens.verify(forged, CALLBACK_URI))
+        forged = ".".join((kid, str(int(expiry) + 1000), addr, mac))
+        self.assertIsNone(self.tokens.verify(forged, CALLBACK_URI))
+
+    def test_expiry(self):
+        token = self.tokens.issue(ADDRESS, CALLBACK_URI)
+        self.clock.now += 60
+        self.assertEqual(ADDRESS, self.tokens.verify(token, CALLBACK_URI))
+        self.clock.now += 1
+        self.assertIsNone(self.tokens.verify(token, CALLBACK_URI))
+
+    def test_garbage(self):
+        for token in ("", "garbage", "k1.x.y.z", "k1.1.2.3.4", None):
+            self.assertIsNone(self.tokens.verify(token, CALLBACK_URI))
+
+    def test_key_rotation(self):
+        old_token = self.tokens.issue(ADDRESS, CALLBACK_URI)
+        self.tokens.rotate("k2", b"secret2")
+        self.assertEqual("k2", self.tokens.current_kid)
+        new_token = self.tokens.issue(ADDRESS, CALLBACK_URI)
+        self.assertTrue(new_token.startswith("k2."))
+        self.assertEqual(ADDRESS, self.tokens.verify(old_token, CALLBACK_URI))
+        self.assertEqual(ADDRESS, self.tokens.verify(new_token, CALLBACK_URI))
+        self.tokens.retire("k1")
+        self.assertIsNone(self.tokens.verify(old_token, CALLBACK_URI))
+        self.assertEqual(ADDRESS, self.tokens.verify(new_token, CALLBACK_URI))
+        self.assertRaises(ValueError, self.tokens.retire, "k2")
+
+    def test_invalid_keys(self):
+        self.assertRaises(ValueError, SessionTokens, [])
+        self.assertRaises(ValueError, SessionTokens, [("k.1", b"secret")])
+        other = SessionTokens([("k1", b"other secret")], clock=self.clock)
+        self.assertIsNone(other.verify(self.tokens.issue(ADDRESS, CALLBACK_URI), CALLBACK_URI))
+
+
+if __name__ == '__main__':
+    unittest.main()
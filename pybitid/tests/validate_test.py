@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+'''
+Version: 0.0.4
+UnitTest of bulk address validation
+'''
+import os
+import sys
+import tempfile
+import unittest
+import pybitid.validate as validate
+from pybitid.tests import ADDRESS, ADDRESS_TEST
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+
+BAD_ADDRESS       = "1HpE8571PFRwge5coHiFdSCLcwa7qetcm"
+ADDRESSES         = [ADDRESS, ADDRESS_TEST, BAD_ADDRESS, "", "garbage"] * 7
+EXPECTED          = [True, False, False, False, False] * 7
+
+
+class ValidateTestCase(unittest.TestCase):
+
+    def test_chunked(self):
+        chunks = list(validate.chunked(range(7), 3))
+        self.assertEqual([[0, 1, 2], [3, 4, 5], [6]], chunks)
+
+    def test_validate_addresses(self):
+        res = list(validate.validate_addresses(iter(ADDRESSES)))
+        self.assertEqual(list(zip(ADDRESSES, EXPECTED)), res)
+
+    def test_validate_addresses_testnet(self):
+        res = [v for a, v in validate.validate_addresses([ADDRESS, ADDRESS_TEST], True)]
+        self.assertEqual([False, True], res)
+
+    def test_validate_addresses_parallel_keeps_order(self):
+        res = list(validate.validate_addresses(iter(ADDRESSES), processes=2, chunk_size=2))
+        self.assertEqual(list(zip(ADDRESSES, EXPECTED)), res)
+
+    def test_main(self):
+        fd, path = tempfile.mkstemp()
+        os.write(fd, "\n".join(ADDRESSES[:3]).encode())
+        os.close(fd)
+        stdout = sys.stdout
+        sys.stdout = StringIO()
+        try:
+            validate.main([path, '--jobs', '1'])
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+            os.remove(path)
+        self.assertEqual("%s\t1\n%s\t0\n%s\t0\n" % tuple(ADDRESSES[:3]), output)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+'''
+Version: 0.0.4
+Bulk validation of bitcoin addresses
+Usage:
+    python -m pybitid.validate [--testnet] [--jobs N] [--chunk-size N] [file]
+Reads newline-delimited addresses from a file (or stdin) and writes "address<TAB>1|0" lines in input order.
+'''
+import sys
+import argparse
+import multiprocessing
+from collections import deque
+from itertools import islice
+from pybitid import pybitcointools as bittools
+
+CHUNK_SIZE          = 1000
+# Max number of chunks queued per worker process (bounds memory usage)
+CHUNKS_PER_WORKER   = 2
+
+
+def chunked(iterable, size):
+    '''
+    Splits an iterable in lists of (at most) size elements
+    Parameters:
+        iterable = iterable to split
+        size     = size of the chunks
+    '''
+    it = iter(iterable)
+    chunk = list(islice(it, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(it, size))
+
+
+def validate_chunk(args):
+    '''
+    Validates a list of addresses
+    Returns a list of booleans
+    Parameters:
+        args = tuple (list of addresses, is_testnet)
+    '''
+    addrs, is_testnet = args
+    return [bittools.address_verify(addr, is_testnet) for addr in addrs]
+
+
+def validate_addresses(addrs, is_testnet=False, processes=1, chunk_size=CHUNK_SIZE):
+    '''
+    Validates a stream of addresses
+    Yields tuples (address, is_valid) in input order. Memory usage is bounded by processes and chunk_size.
+    Parameters:
+        addrs      = iterable of addresses
+        is_testnet = True if addresses must be checked for the testnet, False for the mainnet (default)
+        processes  = number of worker processes (optional, default = 1 => validation in current process)
+        chunk_size = number of addresses sent to a worker in one task (optional)
+    '''
+    if processes <= 1:
+        for addr in addrs:
+            yield addr, bittools.address_verify(addr, is_testnet)
+        return
+
+    for chunk, results in map_chunks(validate_chunk, chunked(addrs, chunk_size), processes, is_testnet):
+        for item in zip(chunk, results): yield item
+
+
+def map_chunks(func, chunks, processes, *args):
+    '''
+    Applies a function to chunks of data in a pool of worker processes
+    Yields tuples (chunk, func((chunk,) + args)) in input order. At most processes * CHUNKS_PER_WORKER chunks are queued.
+    Parameters:
+        func      = function applied to each chunk (must be picklable)
+        chunks    = iterable of chunks
+        processes = number of worker processes
+        args      = extra parameters passed to func with each chunk
+    '''
+    pool = multiprocessing.Pool(processes)
+    try:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, pool.apply_async(func, ((chunk,) + args,))))
+            if len(pending) >= processes * CHUNKS_PER_WORKER:
+                chunk, res = pending.popleft()
+                yield chunk, res.get()
+        while pending:
+            chunk, res = pending.popleft()
+            yield chunk, res.get()
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m pybitid.validate', description='Validates newline-delimited bitcoin addresses')
+    parser.add_argument('file', nargs='?', help='file of addresses (default = stdin)')
+    parser.add_argument('-t', '--testnet', action='store_true', help='validates addresses for the testnet')
+    parser.add_argument('-j', '--jobs', type=int, default=multiprocessing.cpu_count(), help='number of worker processes')
+    parser.add_argument('-c', '--chunk-size', type=int, default=CHUNK_SIZE, help='number of addresses per task')
+    args = parser.parse_args(argv)
+
+    infile = open(args.file) if args.file else sys.stdin
+    try:
+        addrs = (line.strip() for line in infile)
+        for addr, is_valid in validate_addresses(addrs, args.testnet, args.jobs, args.chunk_size):
+            sys.stdout.write("%s\t%d\n" % (addr, is_valid))
+    finally:
+        if infile is not sys.stdin: infile.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
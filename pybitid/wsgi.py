@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+'''
+Version: 0.0.4
+WSGI app and middleware handling the callbacks posted by wallets
+Usage:
+    app = BitIdWSGIMiddleware(app, "https://www.mysite.com/callback", on_login=my_login_function, controller=controller)
+'''
+from pybitid.callback import CallbackHandler, VerifierOverloaded, STATUS_LINES, MAX_BODY_SIZE
+
+
+class BitIdWSGIApp(CallbackHandler):
+    '''
+    WSGI app checking the callbacks posted by wallets
+    The request thread waits for the signature check, which runs in the bounded verifier
+    '''
+    def __call__(self, environ, start_response):
+        status, headers, body = self.handle(environ)
+        start_response(STATUS_LINES[status], headers)
+        return [body]
+
+    def handle(self, environ):
+        if environ.get("REQUEST_METHOD") != "POST": return self.response(405, "Method not allowed")
+        try:
+            length = int(environ.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            return self.response(400, "Invalid request")
+        if length > MAX_BODY_SIZE: return self.response(413, "Request too large")
+        body = environ["wsgi.input"].read(length) if length > 0 else b""
+
+        response, fields = self.precheck(body, environ.get("CONTENT_TYPE"))
+        if response is not None: return response
+        response, nonce = self.admit(fields, environ.get("REMOTE_ADDR"))
+        if response is not None: return response
+        is_valid = False
+        try:
+            try:
+                future = self.submit(fields)
+            except VerifierOverloaded:
+                return self.overloaded()
+            is_valid = future.result()
+        finally:
+            self.release(nonce, is_valid)
+        return self.complete(fields, is_valid, self.login(fields) if is_valid else None)
+
+
+class BitIdWSGIMiddleware(object):
+    '''
+    WSGI middleware routing the POST requests sent to the callback path to a BitIdWSGIApp
+    '''
+    def __init__(self, app, callback_uri, on_login=None, is_testnet=False, verifier=None, controller=None):
+        '''
+        Parameters:
+            app          = wrapped WSGI app
+            callback_uri = callback uri used by the website
+            on_login     = function called with (address, nonce) when a challenge is valid (optional).
+                           The login is refused (401) if it returns False
+            is_testnet   = True if validation done for test network, False for main network (optional, default = False)
+            verifier     = BoundedVerifier used for signature checks (optional)
+            controller   = AdmissionController checking the nonces (optional)
+        '''
+        self.app = app
+        self.callback_app = BitIdWSGIApp(callback_uri, on_login, is_testnet, verifier, controller)
+
+    def __call__(self, environ, start_response):
+        if environ.get("REQUEST_METHOD") == "POST" and environ.get("PATH_INFO") == self.callback_app.callback_path:
+            return self.callback_app(environ, start_response)
+        return self.app(environ, start_response)